@@ -0,0 +1,687 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ATcn考试系统性能基准脚本
+使用临时数据库和合成数据，不会影响 src/database/app.db
+
+用法：
+    python benchmark.py check
+    python benchmark.py import --rows 10000 100000 1000000 --chunk-size 1000 --processes 16
+    python benchmark.py classify --rows 100000
+    python benchmark.py search --questions 200000
+    python benchmark.py paginate --questions 200000 --page 1000
+    python benchmark.py plans
+    python benchmark.py near-duplicates --questions 200000
+    python benchmark.py batch --questions 10000 --operations 300
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import datetime
+import argparse
+import tempfile
+import shutil
+import zipfile
+from pathlib import Path
+
+import numpy as np
+from flask import Flask
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from src.models.user import db
+from src.models.question import Question
+from src.models.exam import AnswerRecord, ExamRecord, WrongQuestion
+from src.models.migrations import create_missing_indexes
+from src.services.excel_import import QuestionImporter, iter_parsed_batches, parse_row, parse_rows
+from src.services.question_search import question_search
+from src.services.pagination import encode_cursor, keyset_page
+from src.services.near_duplicates import NearDuplicateIndex, minhash_signatures
+
+STEMS = [
+    '以下哪些属于国家商用密码算法',
+    '判断：SM4是一种对称分组密码算法',
+    '下列关于SM2数字签名的说法正确的是',
+    '关于密钥管理的要求，下列选项正确的是',
+    '国密标准中属于杂凑算法的是',
+]
+ANSWERS = ['A', 'B', 'C', 'D', 'A,B', 'ABCD', '正确', '错误']
+
+# 一致性检查用的单元格素材：题型关键词、各种空白、大小写、全角符号及非字符串值
+FUZZ_TEXTS = [
+    '判断', '对错', '正确', '错误', '是否', '√', '×', 'TRUE', 'False', '（判断）', '(判断)',
+    '多选', '选择', '（多选）', '(多选)', '以下哪些', '包括哪些', '单选', '题目', '1.',
+    'SM2', 'İ', 'ß', 'Σ', 'ǅ', '\x1c', '\u2028', '对', '错', 'a', 'b', 'f', 'g', 'A，C', 'a,b', ' ', '\t', '\n', '\u3000', '\xa0', '',
+]
+FUZZ_VALUES = [None, None, '', '   ', 0, 1, 3, 2.5, float('nan'), True, False, datetime.datetime(2024, 1, 2, 3, 4, 5)]
+
+def fuzz_cell(rnd):
+    if rnd.random() < 0.3:
+        return rnd.choice(FUZZ_VALUES)
+    return ''.join(rnd.choice(FUZZ_TEXTS) for _ in range(rnd.randint(1, 8)))
+
+def fuzz_rows(count, seed=1):
+    """生成长度不一、内容随机的行，覆盖各种边界情况"""
+    rnd = random.Random(seed)
+    rows = []
+    for number in range(count):
+        length = rnd.randint(0, 12)
+        row = [fuzz_cell(rnd) for _ in range(length)]
+        if row and rnd.random() < 0.7:
+            row[0] = f'{rnd.choice(STEMS)}{fuzz_cell(rnd)}（第{number}题）'
+        rows.append(tuple(row))
+    return rows
+
+def create_app(workdir):
+    """创建指向临时数据库的最小应用"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        question_search.ensure_index()
+    return app
+
+def make_workbook(path, rows, sheets=4, seed=1):
+    """生成合成题库工作簿（write_only 模式，内存占用恒定）"""
+    from openpyxl import Workbook
+
+    rnd = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    per_sheet = -(-rows // sheets)
+    number = 0
+    sheet_rows = []
+    for sheet in range(sheets):
+        worksheet = workbook.create_sheet(f'第{sheet + 1}章')
+        worksheet.append(['题目', '选项A', '选项B', '选项C', '选项D', '答案'])
+        count = min(per_sheet, rows - number)
+        for _ in range(count):
+            number += 1
+            worksheet.append([
+                f'{rnd.choice(STEMS)}（第{number}题）',
+                f'选项{number}A', f'选项{number}B', f'选项{number}C', f'选项{number}D',
+                rnd.choice(ANSWERS)
+            ])
+        sheet_rows.append(count + 1)
+    workbook.save(path)
+    add_dimensions(path, sheet_rows)
+
+def add_dimensions(path, sheet_rows):
+    """补写工作表尺寸（<dimension>）
+
+    write_only 模式不写尺寸，只读模式打开时会为此扫描整个工作表；
+    Excel 保存的文件都带有尺寸，补上后基准结果与真实文件一致。
+    """
+    source_path = path + '.tmp'
+    os.replace(path, source_path)
+    with zipfile.ZipFile(source_path) as source, zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            with source.open(item) as src, target.open(item.filename, 'w', force_zip64=True) as dst:
+                name = item.filename
+                if name.startswith('xl/worksheets/sheet') and name.endswith('.xml'):
+                    index = int(name[len('xl/worksheets/sheet'):-len('.xml')]) - 1
+                    head = src.read(4096)
+                    dimension = f'</sheetPr><dimension ref="A1:F{sheet_rows[index]}" />'.encode()
+                    dst.write(head.replace(b'</sheetPr>', dimension, 1))
+                shutil.copyfileobj(src, dst)
+    os.remove(source_path)
+
+def import_workbook(path, chunk_size, processes=1):
+    """按导入任务的流程导入工作簿，返回导入器"""
+    importer = QuestionImporter(chunk_size=chunk_size)
+    for sheet_name, batch, error_count in iter_parsed_batches(path, processes=processes):
+        importer.error_count += error_count
+        for fields in batch:
+            importer.add(sheet_name, fields)
+    importer.flush()
+    return importer
+
+def bench_import(args):
+    """题库导入吞吐量（行/秒）"""
+    print(f"{'行数':>10} {'分块':>6} {'进程':>4} {'生成(s)':>9} {'导入(s)':>9} {'行/秒':>10} {'失败块':>6}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, f'bench_{rows}.xlsx')
+
+            start = time.perf_counter()
+            make_workbook(path, rows, sheets=args.sheets)
+            generate_seconds = time.perf_counter() - start
+
+            app = create_app(workdir)
+            with app.app_context():
+                start = time.perf_counter()
+                importer = import_workbook(path, args.chunk_size, args.processes)
+                import_seconds = time.perf_counter() - start
+
+                assert Question.query.count() == importer.imported_count
+                failed = sum(1 for chunk in importer.chunks if 'error' in chunk)
+                db.session.remove()
+                db.engine.dispose()
+
+            print(f"{rows:>10} {args.chunk_size:>6} {args.processes:>4} {generate_seconds:>9.2f} {import_seconds:>9.2f} "
+                  f"{importer.imported_count / import_seconds:>10.0f} {failed:>6}")
+
+def bank_rows(count, seed=1):
+    """生成与合成题库工作簿相同格式的行"""
+    rnd = random.Random(seed)
+    return [
+        (f'{rnd.choice(STEMS)}（第{number}题）',
+         f'选项{number}A', f'选项{number}B', f'选项{number}C', f'选项{number}D',
+         rnd.choice(ANSWERS))
+        for number in range(count)
+    ]
+
+def parse_both(rows, block_size):
+    """分别逐行、整列解析，返回 (逐行结果, 整列结果, 逐行耗时, 整列耗时)"""
+    start = time.perf_counter()
+    expected = [parse_row(row) for row in rows]
+    row_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = []
+    for offset in range(0, len(rows), block_size):
+        actual.extend(parse_rows(rows[offset:offset + block_size]))
+    column_seconds = time.perf_counter() - start
+    return expected, actual, row_seconds, column_seconds
+
+def classify_failures(name, rows, expected, actual):
+    """整列解析与逐行解析的不一致项，返回失败说明列表"""
+    if len(actual) != len(expected):
+        return [f"[{name}] 整列解析返回 {len(actual)} 行，逐行解析 {len(expected)} 行"]
+    return [
+        f"[{name}] 行 {i}: {rows[i]!r}\n    逐行 {expected[i]!r}\n    整列 {actual[i]!r}"
+        for i, (a, b) in enumerate(zip(expected, actual)) if a != b
+    ]
+
+def check_classify(rows=20000, block_size=1000):
+    """整列解析必须与逐行解析逐行一致"""
+    failures = []
+    for name, data in (('边界数据', fuzz_rows(rows)), ('题库数据', bank_rows(rows))):
+        expected, actual, _, _ = parse_both(data, block_size)
+        failures.extend(classify_failures(name, data, expected, actual))
+    return failures
+
+def bench_classify(args):
+    """整列解析与逐行解析的一致性检查和耗时对比，不一致时退出码为1"""
+    failed = False
+    for name, rows in (('边界数据', fuzz_rows(args.rows)), ('题库数据', bank_rows(args.rows))):
+        expected, actual, row_seconds, column_seconds = parse_both(rows, args.block_size)
+        failures = classify_failures(name, rows, expected, actual)
+        questions = sum(1 for fields in expected if fields is not None)
+        print(f"[{name}] 行数 {len(rows)}，题目 {questions}，不一致 {len(failures)}")
+        print(f"  逐行解析 {row_seconds:.2f}s（{len(rows) / row_seconds:.0f} 行/秒）")
+        print(f"  整列解析 {column_seconds:.2f}s（{len(rows) / column_seconds:.0f} 行/秒），块大小 {args.block_size}")
+        for failure in failures[:5]:
+            print('  ' + failure)
+        failed = failed or bool(failures)
+
+    if failed:
+        sys.exit(1)
+
+def make_vocabulary(rnd, size=5000):
+    """生成随机中文词表（2-4个常用汉字）"""
+    chars = [chr(code) for code in range(0x4e00, 0x4e00 + 800)]
+    return [''.join(rnd.choice(chars) for _ in range(rnd.randint(2, 4))) for _ in range(size)]
+
+def seed_questions(count, seed=1):
+    """向临时数据库写入随机题目，返回词表"""
+    rnd = random.Random(seed)
+    words = make_vocabulary(rnd)
+    batch = []
+    for number in range(count):
+        question_text = ''.join(rnd.choice(words) for _ in range(rnd.randint(8, 15))) + f'（第{number}题）'
+        batch.append({
+            'question_text': question_text,
+            'question_type': rnd.choice(['single', 'multiple', 'judge']),
+            'option_a': rnd.choice(words), 'option_b': rnd.choice(words),
+            'option_c': rnd.choice(words), 'option_d': rnd.choice(words),
+            'correct_answer': 'A',
+            'difficulty': 1,
+            'content_hash': Question.compute_content_hash(question_text)
+        })
+        if len(batch) >= 10000:
+            insert_seeded(batch)
+            batch = []
+    if batch:
+        insert_seeded(batch)
+    db.session.commit()
+    return words
+
+def insert_seeded(batch):
+    from sqlalchemy import insert
+
+    signatures = minhash_signatures([row['question_text'] for row in batch])
+    for row, signature in zip(batch, signatures):
+        row['minhash'] = signature
+    db.session.execute(insert(Question), batch)
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def bench_search(args):
+    """题目检索延迟：全文索引与 LIKE 对比（与题目列表接口相同的分页查询）"""
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(workdir)
+        with app.app_context():
+            start = time.perf_counter()
+            words = seed_questions(args.questions)
+            print(f"写入 {args.questions} 道题目（含全文索引触发器）{time.perf_counter() - start:.1f}s")
+
+            rnd = random.Random(2)
+            characters = sorted(set(''.join(words)))
+            terms = {
+                '3字以上词': [word for word in words if len(word) >= 3],
+                '两个相邻词': [a + b for a, b in zip(words, words[1:])],
+                '单字': characters,
+                '两字': [word[:2] for word in words if len(word) >= 2],
+                '不存在的词': ['不存在的检索词', '嗳'],
+            }
+            print(f"{'检索词':<10} {'方式':<6} {'平均命中':>8} {'p50(ms)':>8} {'p95(ms)':>8}")
+            for name, candidates in terms.items():
+                samples = [rnd.choice(candidates) for _ in range(args.queries)]
+                for method, available in (('FTS5', True), ('LIKE', False)):
+                    question_search.available = question_search.short_available = available
+                    latencies = []
+                    hits = 0
+                    for search in samples[:args.queries if available else max(1, args.queries // 10)]:
+                        begin = time.perf_counter()
+                        page = question_search.apply(Question.query, search).paginate(page=1, per_page=20, error_out=False)
+                        [question.to_dict() for question in page.items]
+                        latencies.append((time.perf_counter() - begin) * 1000)
+                        hits += page.total
+                    print(f"{name:<10} {method:<6} {hits / len(latencies):>8.1f} "
+                          f"{percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.95):>8.2f}")
+                question_search.available = question_search.short_available = True
+            db.session.remove()
+            db.engine.dispose()
+
+def bench_paginate(args):
+    """题目列表深分页延迟：页码分页（含/不含总数）与游标分页对比"""
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(workdir)
+        with app.app_context():
+            start = time.perf_counter()
+            seed_questions(args.questions)
+            print(f"写入 {args.questions} 道题目 {time.perf_counter() - start:.1f}s")
+
+            # 游标取自第 page-1 页最后一道题，与客户端逐页翻到该页时拿到的游标相同
+            offset = (args.page - 1) * args.per_page
+            last_id = db.session.query(Question.id).order_by(Question.id).offset(offset - 1).limit(1).scalar()
+            cursor = encode_cursor([last_id])
+
+            methods = {
+                '页码分页+总数': lambda: Question.query.order_by(Question.id).paginate(
+                    page=args.page, per_page=args.per_page, error_out=False).items,
+                '页码分页 with_total=false': lambda: Question.query.order_by(Question.id).paginate(
+                    page=args.page, per_page=args.per_page, error_out=False, count=False).items,
+                '游标分页+总数': lambda: (keyset_page(Question.query, [Question.id], after=cursor,
+                                                 per_page=args.per_page, descending=False)[0],
+                                     Question.query.count())[0],
+                '游标分页 with_total=false': lambda: keyset_page(Question.query, [Question.id], after=cursor,
+                                                             per_page=args.per_page, descending=False)[0],
+            }
+            expected = None
+            print(f"第 {args.page} 页（每页 {args.per_page} 条）")
+            print(f"{'方式':<24} {'p50(ms)':>8} {'p95(ms)':>8}")
+            for name, fetch in methods.items():
+                latencies = []
+                for _ in range(args.repeat):
+                    begin = time.perf_counter()
+                    questions = fetch()
+                    [question.to_dict() for question in questions]
+                    latencies.append((time.perf_counter() - begin) * 1000)
+                ids = [question.id for question in questions]
+                if expected is None:
+                    expected = ids
+                elif ids != expected:
+                    print(f"{name} 结果与页码分页不一致")
+                    sys.exit(1)
+                print(f"{name:<24} {percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.95):>8.2f}")
+            db.session.remove()
+            db.engine.dispose()
+
+# 热点查询使用的二级索引；plans 先删除它们模拟旧数据库，再由迁移补建
+HOT_PATH_INDEXES = [
+    'ix_exam_record_user_status',
+    'ix_exam_record_user_start',
+    'ix_answer_record_exam_question',
+    'ix_wrong_question_user_last_wrong',
+    'ix_question_type',
+]
+
+def hot_path_queries():
+    """路由与服务中的热点查询：(名称, 迁移后应使用的索引, 语句)"""
+    answer_table = AnswerRecord.__table__
+    return [
+        ('未完成考试检查', 'ix_exam_record_user_status',
+         ExamRecord.query.filter_by(user_id=1, status='in_progress').limit(1)),
+        ('考试记录列表', 'ix_exam_record_user_start', ExamRecord.query.filter_by(user_id=1).order_by(
+            ExamRecord.start_time.desc(), ExamRecord.id.desc()).limit(10)),
+        ('考试作答记录', 'ix_answer_record_exam_question', AnswerRecord.query.filter_by(exam_id=1)),
+        ('暂存答案覆盖', 'ix_answer_record_exam_question', answer_table.delete().where(
+            answer_table.c.exam_id == 1, answer_table.c.question_id == 1)),
+        ('错题查找', 'ix_wrong_question_user_question',
+         WrongQuestion.query.filter_by(user_id=1, question_id=1)),
+        ('错题列表', 'ix_wrong_question_user_last_wrong', db.session.query(WrongQuestion, Question).join(
+            Question, Question.id == WrongQuestion.question_id
+        ).filter(WrongQuestion.user_id == 1, WrongQuestion.is_mastered == False).order_by(
+            WrongQuestion.last_wrong_time.desc(), WrongQuestion.id.desc()).limit(20)),
+        ('按题型列出题目', 'ix_question_type',
+         Question.query.filter_by(question_type='single').order_by(Question.id).limit(20)),
+    ]
+
+def query_plan(statement):
+    """返回语句的 EXPLAIN QUERY PLAN 明细行"""
+    statement = getattr(statement, 'statement', statement)
+    compiled = statement.compile(dialect=db.engine.dialect)
+    params = compiled.construct_params()
+    values = tuple(params[name] for name in compiled.positiontup)
+    rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), values).all()
+    return [row[-1] for row in rows]
+
+def slow_steps(plan):
+    """全表扫描（不经过索引）和临时排序步骤"""
+    return [step for step in plan if (step.startswith('SCAN') and 'USING' not in step) or 'TEMP B-TREE' in step]
+
+def uses_index(plan, index):
+    return any(re.search(rf'USING (COVERING )?INDEX {index}\b', step) for step in plan)
+
+def plan_failures(name, index, plan):
+    """迁移后的执行计划未使用预期索引、或仍有全表扫描和临时排序时的失败说明"""
+    failures = []
+    if not uses_index(plan, index):
+        failures.append(f'{name} 未使用索引 {index}: ' + ' | '.join(plan))
+    if slow_steps(plan):
+        failures.append(f'{name} 仍有全表扫描或临时排序: ' + ' | '.join(slow_steps(plan)))
+    return failures
+
+def drop_hot_path_indexes():
+    """删除热点查询索引，模拟迁移前的旧数据库"""
+    for name in HOT_PATH_INDEXES:
+        db.session.execute(db.text(f'DROP INDEX IF EXISTS {name}'))
+    db.session.commit()
+
+def check_plans():
+    """迁移补建索引后，每个热点查询都必须使用预期的索引"""
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(workdir)
+        with app.app_context():
+            drop_hot_path_indexes()
+            create_missing_indexes()
+            for name, index, statement in hot_path_queries():
+                failures.extend(plan_failures(name, index, query_plan(statement)))
+            db.session.remove()
+            db.engine.dispose()
+    return failures
+
+def bench_plans(args):
+    """热点查询执行计划：迁移前（无索引）与迁移后对比，迁移后未使用预期索引或仍有全表扫描、临时排序时退出码为1"""
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(workdir)
+        with app.app_context():
+            drop_hot_path_indexes()
+            before = {name: query_plan(statement) for name, _, statement in hot_path_queries()}
+            # EXPLAIN 不检查结构版本，归还连接后再取，避免沿用删除索引时缓存的表结构
+            db.session.commit()
+
+            create_missing_indexes()
+            failed = False
+            for name, index, statement in hot_path_queries():
+                after = query_plan(statement)
+                print(f'== {name}')
+                print('  迁移前: ' + ' | '.join(before[name]))
+                print('  迁移后: ' + ' | '.join(after))
+                for failure in plan_failures(name, index, after):
+                    print('  ' + failure)
+                    failed = True
+            db.session.remove()
+            db.engine.dispose()
+    if failed:
+        sys.exit(1)
+
+def near_variant(rnd, text):
+    """构造近似重复的题干：改标点和空格，或删掉、插入一个字"""
+    choice = rnd.randrange(3)
+    if choice == 0:
+        return text.replace('（', '(').replace('）', ')') + ' ？'
+    position = rnd.randrange(len(text))
+    if choice == 1:
+        return text[:position] + text[position + 1:]
+    return text[:position] + '的' + text[position:]
+
+def bench_near_duplicates(args):
+    """近似重复检测：LSH 查找与逐一比较签名的延迟，以及注入的近似重复题目的检出率"""
+    from sqlalchemy import insert
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(workdir)
+        with app.app_context():
+            start = time.perf_counter()
+            seed_questions(args.questions)
+            print(f"写入 {args.questions} 道题目 {time.perf_counter() - start:.1f}s")
+
+            # 随机挑选题目写入一道近似重复的变体
+            rnd = random.Random(3)
+            originals = dict(db.session.query(Question.id, Question.question_text).filter(
+                Question.id.in_(rnd.sample(range(1, args.questions + 1), args.variants))))
+            variants = {}
+            for question_id, question_text in originals.items():
+                variant = near_variant(rnd, question_text)
+                variants[variant] = question_id
+            rows = [{'question_text': text, 'question_type': 'single', 'correct_answer': 'A',
+                     'content_hash': Question.compute_content_hash(text)} for text in variants]
+            for row, signature in zip(rows, minhash_signatures(list(variants))):
+                row['minhash'] = signature
+            db.session.execute(insert(Question), rows)
+            db.session.commit()
+
+            index = NearDuplicateIndex()
+            start = time.perf_counter()
+            index.rebuild()
+            print(f"构建 LSH 索引（{len(index)} 道题）{time.perf_counter() - start:.2f}s")
+
+            start = time.perf_counter()
+            groups = index.groups()
+            grouped = {question_id for group in groups for question_id in group}
+            print(f"近似重复分组 {len(groups)} 组 {time.perf_counter() - start:.2f}s")
+
+            variant_ids = dict(db.session.query(Question.question_text, Question.id).filter(
+                Question.question_text.in_(list(variants))))
+            pairs = [(variants[text], variant_ids[text]) for text in variants]
+            found = sum(1 for original_id, variant_id in pairs if original_id in grouped and variant_id in grouped)
+            print(f"注入 {len(pairs)} 对近似重复，检出 {found} 对（{found / len(pairs):.1%}）")
+
+            # 逐一比较：把全部签名放进矩阵，一次向量化比较
+            signatures = db.session.query(Question.id, Question.minhash).filter(Question.minhash.isnot(None)).all()
+            question_ids = [question_id for question_id, _ in signatures]
+            matrix = np.frombuffer(b''.join(signature for _, signature in signatures),
+                                   dtype='<u4').reshape(len(question_ids), -1)
+            samples = [index.signature(variant_id) for _, variant_id in rnd.sample(pairs, min(len(pairs), args.queries))]
+
+            print(f"{'方式':<12} {'p50(ms)':>8} {'p95(ms)':>8} {'平均命中':>8}")
+            for name, lookup in (
+                ('LSH', lambda signature: [question_id for question_id, _ in index.find(signature)]),
+                ('逐一比较', lambda signature: [
+                    question_ids[i] for i in np.flatnonzero(
+                        (matrix == np.frombuffer(signature, dtype='<u4')).mean(axis=1) >= index.threshold)]),
+            ):
+                latencies = []
+                hits = 0
+                for signature in samples:
+                    begin = time.perf_counter()
+                    hits += len(lookup(signature))
+                    latencies.append((time.perf_counter() - begin) * 1000)
+                print(f"{name:<12} {percentile(latencies, 0.5):>8.3f} {percentile(latencies, 0.95):>8.3f} "
+                      f"{hits / len(samples):>8.2f}")
+            db.session.remove()
+            db.engine.dispose()
+
+def admin_client(app):
+    """注册题目接口并返回已带管理员会话的测试客户端"""
+    from src.routes.question import question_bp
+
+    app.config['SECRET_KEY'] = 'benchmark'
+    app.register_blueprint(question_bp, url_prefix='/api')
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['role'] = 'ADMIN'
+    return client
+
+def bench_batch(args):
+    """批量接口与逐题接口的吞吐量对比（修改答案、新增、删除）"""
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(workdir)
+        client = admin_client(app)
+        with app.app_context():
+            seed_questions(args.questions)
+            db.session.remove()
+
+        rnd = random.Random(4)
+        ids = rnd.sample(range(1, args.questions + 1), args.operations * 4)
+        count = args.operations
+        cases = {
+            '修改答案': (
+                [('PUT', f'/api/questions/{question_id}', {'correct_answer': 'B'}) for question_id in ids[:count]],
+                [{'action': 'update', 'id': question_id, 'question': {'correct_answer': 'B'}}
+                 for question_id in ids[count:count * 2]],
+            ),
+            '新增': (
+                [('POST', '/api/questions', {'question_text': f'逐题新增的题目{i}', 'question_type': 'single',
+                                             'correct_answer': 'A'}) for i in range(count)],
+                [{'action': 'create', 'question': {'question_text': f'批量新增的题目{i}', 'question_type': 'single',
+                                                   'correct_answer': 'A'}} for i in range(count)],
+            ),
+            '删除': (
+                [('DELETE', f'/api/questions/{question_id}', None) for question_id in ids[count * 2:count * 3]],
+                [{'action': 'delete', 'id': question_id} for question_id in ids[count * 3:]],
+            ),
+        }
+        print(f"题库 {args.questions} 道题目，每种操作 {count} 项")
+        print(f"{'操作':<8} {'逐题(s)':>8} {'逐题 项/秒':>10} {'批量(s)':>8} {'批量 项/秒':>10} {'倍数':>6}")
+        for name, (requests, operations) in cases.items():
+            start = time.perf_counter()
+            for method, url, body in requests:
+                response = client.open(url, method=method, json=body)
+                assert response.status_code in (200, 201), response.get_json()
+            single = time.perf_counter() - start
+
+            start = time.perf_counter()
+            response = client.post('/api/questions/batch', json={'operations': operations})
+            batch = time.perf_counter() - start
+            result = response.get_json()
+            assert response.status_code == 200 and not result['failed'], result
+            print(f"{name:<8} {single:>8.2f} {count / single:>10.0f} {batch:>8.2f} {count / batch:>10.0f} "
+                  f"{single / batch:>6.1f}")
+
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+def check_short_search(questions=2000, queries=300):
+    """不足3个字符的检索词走单字索引，结果必须与 LIKE 子串匹配一致（含修改、删除题目后）"""
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(workdir)
+        with app.app_context():
+            words = seed_questions(questions)
+            rnd = random.Random(4)
+            # 大小写、标点和空格
+            extra = ['Abc, DEF？', 'x y', '中 文', 'aBC（def）']
+            db.session.add_all(Question(question_text=value, question_type='single', correct_answer='A',
+                                        content_hash=Question.compute_content_hash(value)) for value in extra)
+            db.session.commit()
+            for question in Question.query.filter(Question.id.in_(rnd.sample(range(1, questions + 1), 50))):
+                question.option_a = rnd.choice(words) + 'Q'
+            Question.query.filter(Question.id.in_(rnd.sample(range(1, questions + 1), 50))).delete()
+            db.session.commit()
+
+            corpus = ''.join(words) + ''.join(extra)
+            samples = [corpus[i:i + rnd.randint(1, 2)] for i in (rnd.randrange(len(corpus)) for _ in range(queries))]
+            samples += ['a', 'C', 'q', ' ', ', ', 'y', '中 ', '（', '题）', '嗳']
+            for search in samples:
+                ids = [question.id for question in question_search.apply(Question.query, search)]
+                question_search.short_available = False
+                expected = [question.id for question in question_search.apply(Question.query, search)]
+                question_search.short_available = True
+                if ids != expected:
+                    failures.append(f'检索 {search!r}: 单字索引 {len(ids)} 条，LIKE {len(expected)} 条')
+            db.session.remove()
+            db.engine.dispose()
+    return failures
+
+# check 子命令运行的正确性检查：(名称, 检查函数)，检查函数返回失败说明列表
+CHECKS = [
+    ('整列解析一致性', check_classify),
+    ('热点查询使用预期索引', check_plans),
+    ('短检索词与子串匹配一致', check_short_search),
+]
+
+def run_checks(args):
+    """运行全部正确性检查（不计时，适合在持续集成中运行），任一检查失败时退出码为1"""
+    failed = False
+    for name, check in CHECKS:
+        failures = check()
+        print(f"{'通过' if not failures else '失败'}  {name}")
+        for failure in failures[:10]:
+            print('  ' + failure)
+        failed = failed or bool(failures)
+    if failed:
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description='ATcn考试系统性能基准')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parser_check = subparsers.add_parser('check', help='正确性检查，失败时退出码为1')
+    parser_check.set_defaults(func=run_checks)
+
+    parser_import = subparsers.add_parser('import', help='题库导入吞吐量')
+    parser_import.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser_import.add_argument('--chunk-size', type=int, default=1000)
+    parser_import.add_argument('--sheets', type=int, default=4)
+    parser_import.add_argument('--processes', type=int, default=1)
+    parser_import.set_defaults(func=bench_import)
+
+    parser_classify = subparsers.add_parser('classify', help='整列解析一致性检查与耗时对比')
+    parser_classify.add_argument('--rows', type=int, default=100000)
+    parser_classify.add_argument('--block-size', type=int, default=1000)
+    parser_classify.set_defaults(func=bench_classify)
+
+    parser_search = subparsers.add_parser('search', help='题目检索延迟')
+    parser_search.add_argument('--questions', type=int, default=200000)
+    parser_search.add_argument('--queries', type=int, default=200)
+    parser_search.set_defaults(func=bench_search)
+
+    parser_paginate = subparsers.add_parser('paginate', help='深分页延迟')
+    parser_paginate.add_argument('--questions', type=int, default=200000)
+    parser_paginate.add_argument('--page', type=int, default=1000)
+    parser_paginate.add_argument('--per-page', type=int, default=20)
+    parser_paginate.add_argument('--repeat', type=int, default=50)
+    parser_paginate.set_defaults(func=bench_paginate)
+
+    parser_plans = subparsers.add_parser('plans', help='热点查询执行计划（索引迁移前后）')
+    parser_plans.set_defaults(func=bench_plans)
+
+    parser_near = subparsers.add_parser('near-duplicates', help='近似重复检测')
+    parser_near.add_argument('--questions', type=int, default=200000)
+    parser_near.add_argument('--variants', type=int, default=1000)
+    parser_near.add_argument('--queries', type=int, default=200)
+    parser_near.set_defaults(func=bench_near_duplicates)
+
+    parser_batch = subparsers.add_parser('batch', help='批量题目接口吞吐量')
+    parser_batch.add_argument('--questions', type=int, default=10000)
+    parser_batch.add_argument('--operations', type=int, default=300)
+    parser_batch.set_defaults(func=bench_batch)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -3,15 +3,26 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, request, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
 from src.models.question import Question
 from src.models.exam import ExamRecord, AnswerRecord, WrongQuestion
+from src.models.migrations import upgrade_schema
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.question import question_bp
 from src.routes.exam import exam_bp
+from src.routes.review import review_bp
+from src.services.question_index import question_index
+from src.services.near_duplicates import near_duplicates
+from src.services.bank_version import bank_version
+from src.services.exam_papers import paper_pool
+from src.services.answer_buffer import answer_buffer
+from src.services.grading_queue import grading_workers
+from src.services.import_jobs import import_jobs
+from src.services.question_search import question_search
+from src.services import bank_events
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -24,24 +35,74 @@ app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(question_bp, url_prefix='/api')
 app.register_blueprint(exam_bp, url_prefix='/api')
+app.register_blueprint(review_bp, url_prefix='/api')
 
 # 数据库配置
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
-with app.app_context():
-    db.create_all()
+# 试卷池配置：预生成试卷数量及触发补充的剩余数量
+app.config['EXAM_PAPER_POOL_SIZE'] = int(os.environ.get('EXAM_PAPER_POOL_SIZE', 200))
+app.config['EXAM_PAPER_POOL_REFILL_THRESHOLD'] = int(os.environ.get('EXAM_PAPER_POOL_REFILL_THRESHOLD', 50))
+
+# 作答暂存配置：是否启用进程内缓冲（只适用于单进程部署）、定时写入间隔（秒）及触发立即写入的积压数量
+app.config['ANSWER_WRITE_BEHIND'] = os.environ.get('ANSWER_WRITE_BEHIND', 'false').lower() == 'true'
+app.config['ANSWER_FLUSH_INTERVAL'] = float(os.environ.get('ANSWER_FLUSH_INTERVAL', 2))
+app.config['ANSWER_FLUSH_SIZE'] = int(os.environ.get('ANSWER_FLUSH_SIZE', 500))
+
+# 异步判分配置：默认交卷模式、判分线程数及本地队列目录
+app.config['EXAM_ASYNC_GRADING'] = os.environ.get('EXAM_ASYNC_GRADING', 'false').lower() == 'true'
+app.config['GRADING_WORKERS'] = int(os.environ.get('GRADING_WORKERS', 2))
+app.config['GRADING_QUEUE_DIR'] = os.path.join(os.path.dirname(__file__), 'database', 'grading_queue')
+
+# 题库导入配置：每个分块的题目数量，每块单独提交
+app.config['IMPORT_CHUNK_SIZE'] = int(os.environ.get('IMPORT_CHUNK_SIZE', 1000))
+app.config['IMPORT_WORKERS'] = int(os.environ.get('IMPORT_WORKERS', 1))
+# 并行解析工作表的进程数（每个导入任务），默认2个，不超过CPU核数
+app.config['IMPORT_PROCESSES'] = int(os.environ.get('IMPORT_PROCESSES', min(2, os.cpu_count() or 1)))
+
+def init_services():
+    """建表、升级数据库结构、构建进程内索引并启动后台线程"""
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+    
+        # 创建默认管理员账户
+        from src.models.user import User
+        admin = User.query.filter_by(username='admin').first()
+        if not admin:
+            admin = User(username='admin', email='admin@example.com', role='ADMIN')
+            admin.set_password('admin123')
+            db.session.add(admin)
+            db.session.commit()
+            print("默认管理员账户已创建: admin/admin123")
     
-    # 创建默认管理员账户
-    from src.models.user import User
-    admin = User.query.filter_by(username='admin').first()
-    if not admin:
-        admin = User(username='admin', email='admin@example.com', role='ADMIN')
-        admin.set_password('admin123')
-        db.session.add(admin)
-        db.session.commit()
-        print("默认管理员账户已创建: admin/admin123")
+        # 构建题型ID索引，供考试抽题使用
+        question_index.rebuild()
+        bank_version.load()
+    
+        # 构建近似重复检测的 LSH 索引
+        near_duplicates.rebuild()
+    
+        # 创建题目全文索引（首次创建时从题目表重建）
+        question_search.ensure_index()
+
+    # 启动试卷池补充线程、作答暂存写入线程、判分线程和导入线程池
+    paper_pool.init_app(app)
+    answer_buffer.init_app(app)
+    grading_workers.init_app(app)
+    import_jobs.init_app(app)
+
+# 导入时的解析进程（forkserver/spawn）会以 __mp_main__ 重新执行本模块，其中不初始化数据库、不启动后台线程
+if __name__ != '__mp_main__':
+    init_services()
+
+@app.before_request
+def sync_question_bank():
+    # 多进程部署时题库可能已被其他进程修改
+    if request.path.startswith('/api/'):
+        bank_events.sync()
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -2,6 +2,13 @@ from src.models.user import db
 from datetime import datetime
 
 class ExamRecord(db.Model):
+    __table_args__ = (
+        # 开始考试时检查该用户是否有未完成的考试
+        db.Index('ix_exam_record_user_status', 'user_id', 'status'),
+        # 考试记录列表按开始时间倒序分页
+        db.Index('ix_exam_record_user_start', 'user_id', 'start_time'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     start_time = db.Column(db.DateTime, default=datetime.utcnow)
@@ -9,7 +16,10 @@ class ExamRecord(db.Model):
     total_questions = db.Column(db.Integer, default=140)
     correct_count = db.Column(db.Integer, default=0)
     score = db.Column(db.Float, default=0.0)
-    status = db.Column(db.String(20), default='in_progress')  # in_progress/completed
+    status = db.Column(db.String(20), default='in_progress')  # in_progress/grading/completed/grading_failed
+    paper_seed = db.Column(db.Integer)  # 试卷随机种子
+    bank_version = db.Column(db.Integer)  # 抽题时的题库版本
+    paper_question_ids = db.Column(db.Text)  # 抽到的题目ID（逗号分隔），题库变更后仍按原题目重建试卷
     
     # 关系
     user = db.relationship('User', backref=db.backref('exam_records', lazy=True))
@@ -31,6 +41,11 @@ class ExamRecord(db.Model):
         }
 
 class AnswerRecord(db.Model):
+    __table_args__ = (
+        # 按考试取作答记录，暂存答案写入时按 (考试, 题目) 覆盖
+        db.Index('ix_answer_record_exam_question', 'exam_id', 'question_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     exam_id = db.Column(db.Integer, db.ForeignKey('exam_record.id'), nullable=False)
     question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
@@ -55,6 +70,15 @@ class AnswerRecord(db.Model):
         }
 
 class WrongQuestion(db.Model):
+    __table_args__ = (
+        # 每个用户每道题只保留一条错题记录，批量判分时据此做 upsert
+        db.Index('ix_wrong_question_user_question', 'user_id', 'question_id', unique=True),
+        # 复习队列按到期时间范围扫描
+        db.Index('ix_wrong_question_user_due', 'user_id', 'due_at'),
+        # 错题列表按最近答错时间倒序分页
+        db.Index('ix_wrong_question_user_last_wrong', 'user_id', 'last_wrong_time'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
@@ -62,6 +86,12 @@ class WrongQuestion(db.Model):
     last_wrong_time = db.Column(db.DateTime, default=datetime.utcnow)
     is_mastered = db.Column(db.Boolean, default=False)
     
+    # 间隔重复复习计划
+    ease = db.Column(db.Float, default=2.5, server_default='2.5')  # 难易系数
+    interval_days = db.Column(db.Float, default=0, server_default='0')  # 当前复习间隔（天）
+    review_count = db.Column(db.Integer, default=0, server_default='0')  # 连续答对次数
+    due_at = db.Column(db.DateTime, default=datetime.utcnow)  # 下次复习时间
+    
     # 关系
     user = db.relationship('User', backref=db.backref('wrong_questions', lazy=True))
     question = db.relationship('Question', backref=db.backref('wrong_records', lazy=True))
@@ -76,6 +106,10 @@ class WrongQuestion(db.Model):
             'question_id': self.question_id,
             'wrong_count': self.wrong_count,
             'last_wrong_time': self.last_wrong_time.isoformat() if self.last_wrong_time else None,
-            'is_mastered': self.is_mastered
+            'is_mastered': self.is_mastered,
+            'ease': self.ease,
+            'interval_days': self.interval_days,
+            'review_count': self.review_count,
+            'due_at': self.due_at.isoformat() if self.due_at else None
         }
 
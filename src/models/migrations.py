@@ -0,0 +1,164 @@
+"""已有数据库的结构升级
+
+db.create_all() 只会创建缺失的表，不会给已存在的表补字段和索引。
+应用启动时调用 upgrade_schema()，把模型中新增的字段和索引补到旧的 app.db 上。
+"""
+from flask import current_app
+from sqlalchemy import bindparam, func, inspect, text
+from src.models.user import db
+from src.models.question import Question
+from src.models.exam import WrongQuestion
+
+def merge_duplicate_wrong_questions():
+    """合并同一用户同一题目的重复错题记录，为唯一索引做准备"""
+    duplicates = db.session.query(
+        WrongQuestion.user_id,
+        WrongQuestion.question_id
+    ).group_by(
+        WrongQuestion.user_id,
+        WrongQuestion.question_id
+    ).having(func.count(WrongQuestion.id) > 1).all()
+    
+    for user_id, question_id in duplicates:
+        records = WrongQuestion.query.filter_by(
+            user_id=user_id,
+            question_id=question_id
+        ).order_by(WrongQuestion.id).all()
+        
+        keep = records[0]
+        keep.wrong_count = sum(r.wrong_count or 0 for r in records)
+        keep.last_wrong_time = max((r.last_wrong_time for r in records if r.last_wrong_time), default=None)
+        keep.is_mastered = all(r.is_mastered for r in records)
+        for record in records[1:]:
+            db.session.delete(record)
+    
+    db.session.commit()
+    return len(duplicates)
+
+def add_missing_columns():
+    """给已存在的表补上模型中新增的字段（新增字段必须可为空）"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+            if column.server_default is not None:
+                ddl += f' DEFAULT {column.server_default.arg}'
+            db.session.execute(text(ddl))
+            added.append(f'{table.name}.{column.name}')
+    
+    db.session.commit()
+    return added
+
+def backfill_review_schedule():
+    """旧错题记录没有复习时间时，以最近答错时间作为到期时间"""
+    WrongQuestion.query.filter(WrongQuestion.due_at.is_(None)).update(
+        {WrongQuestion.due_at: func.coalesce(WrongQuestion.last_wrong_time, func.current_timestamp())},
+        synchronize_session=False
+    )
+    db.session.commit()
+
+def backfill_content_hashes(batch_size=1000):
+    """为旧题目补算内容哈希；题干重复的题目只有最早的一道保留哈希
+
+    返回未设置哈希的重复题目 [(题目ID, 保留哈希的题目ID)]。这些题目仍可修改答案、选项和解析，
+    修改题干时按新题干去重。
+    """
+    duplicates = []
+    if not db.session.query(Question.id).filter(Question.content_hash.is_(None)).first():
+        return duplicates
+    known = dict(db.session.query(Question.content_hash, Question.id).filter(Question.content_hash.isnot(None)))
+    last_id = 0
+    while True:
+        rows = db.session.query(Question.id, Question.question_text).filter(
+            Question.content_hash.is_(None),
+            Question.id > last_id
+        ).order_by(Question.id).limit(batch_size).all()
+        if not rows:
+            break
+        
+        updates = []
+        for question_id, question_text in rows:
+            content_hash = Question.compute_content_hash(question_text)
+            if content_hash in known:
+                duplicates.append((question_id, known[content_hash]))
+            else:
+                known[content_hash] = question_id
+                updates.append({'b_id': question_id, 'b_content_hash': content_hash})
+        if updates:
+            table = Question.__table__
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('b_id')).values(content_hash=bindparam('b_content_hash')),
+                updates
+            )
+        db.session.commit()
+        last_id = rows[-1].id
+    return duplicates
+
+def backfill_minhash_signatures(batch_size=1000):
+    """为旧题目补算题干的 MinHash 签名"""
+    from src.services.near_duplicates import minhash_signature
+    
+    last_id = 0
+    while True:
+        rows = db.session.query(Question.id, Question.question_text).filter(
+            Question.minhash.is_(None),
+            Question.id > last_id
+        ).order_by(Question.id).limit(batch_size).all()
+        if not rows:
+            break
+        
+        updates = [
+            {'b_id': question_id, 'b_minhash': minhash_signature(question_text)}
+            for question_id, question_text in rows
+        ]
+        table = Question.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('b_id')).values(minhash=bindparam('b_minhash')),
+            updates
+        )
+        db.session.commit()
+        last_id = rows[-1].id
+
+def create_missing_indexes():
+    """创建模型中声明但数据库中还不存在的索引
+
+    每个索引单独建立并提交，只在建立该索引期间阻塞对应表的写入；
+    返回本次新建的索引名。
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing_indexes = set()
+        if table.name in existing_tables:
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            index.create(bind=db.engine, checkfirst=True)
+            created.append(index.name)
+    return created
+
+def upgrade_schema():
+    """升级已有数据库结构"""
+    add_missing_columns()
+    merge_duplicate_wrong_questions()
+    backfill_review_schedule()
+    duplicates = backfill_content_hashes()
+    if duplicates:
+        current_app.logger.warning(
+            '%s 道旧题目与已有题目题干重复，未设置内容哈希（可在近似重复题目报告中查看）: %s',
+            len(duplicates),
+            ', '.join(f'{question_id}->{original_id}' for question_id, original_id in duplicates)
+        )
+    backfill_minhash_signatures()
+    create_missing_indexes()
@@ -1,7 +1,17 @@
 from src.models.user import db
 from datetime import datetime
+import hashlib
+import re
+import unicodedata
 
 class Question(db.Model):
+    __table_args__ = (
+        # 按题干内容去重
+        db.Index('ix_question_content_hash', 'content_hash', unique=True),
+        # 题目列表按题型筛选
+        db.Index('ix_question_type', 'question_type'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     question_text = db.Column(db.Text, nullable=False)
     question_type = db.Column(db.String(20), nullable=False)  # single/multiple/judge
@@ -13,6 +23,18 @@ class Question(db.Model):
     explanation = db.Column(db.Text)
     difficulty = db.Column(db.Integer, default=1)  # 1-5难度等级
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    revision = db.Column(db.Integer, default=1, server_default='1')  # 修订号，题目每次修改后递增
+    content_hash = db.Column(db.String(40))  # 规范化题干的SHA-1，用于去重
+    minhash = db.Column(db.LargeBinary)  # 题干的 MinHash 签名，用于近似重复检测
+
+    @staticmethod
+    def compute_content_hash(question_text):
+        """计算题干内容哈希：全角半角统一（NFKC）、合并空白后取SHA-1"""
+        if question_text is None:
+            return None
+        normalized = unicodedata.normalize('NFKC', str(question_text))
+        normalized = re.sub(r'\s+', ' ', normalized).strip()
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
 
     def __repr__(self):
         return f'<Question {self.id}: {self.question_text[:50]}>'
@@ -32,3 +54,43 @@ class Question(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+    def to_exam_dict(self):
+        """考试下发用的精简字段：不含答案、解析等"""
+        return {
+            'id': self.id,
+            'question_text': self.question_text,
+            'question_type': self.question_type,
+            'option_a': self.option_a,
+            'option_b': self.option_b,
+            'option_c': self.option_c,
+            'option_d': self.option_d
+        }
+
+
+class QuestionBankVersion(db.Model):
+    """题库版本号，题库每次变更后递增"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<QuestionBankVersion {self.version}>'
+
+
+class QuestionImportJob(db.Model):
+    """后台题库导入任务的状态与进度，所有进程共享"""
+    __table_args__ = (
+        # 任务列表按提交时间倒序
+        db.Index('ix_question_import_job_created', 'created_at'),
+    )
+
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued/running/completed/cancelled/failed
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    path = db.Column(db.Text)  # 上传文件落盘的路径，任务结束后删除
+    owner = db.Column(db.String(255))  # 执行任务的进程（主机名:进程号）
+    progress = db.Column(db.Text)  # 任务进度（JSON）
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<QuestionImportJob {self.id}: {self.status}>'
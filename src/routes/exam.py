@@ -1,9 +1,14 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, current_app, request, jsonify, session
 from src.models.user import db
 from src.models.question import Question
 from src.models.exam import ExamRecord, AnswerRecord, WrongQuestion
+from src.routes.question import require_admin
+from src.services.exam_papers import encode_question_ids, get_exam_paper, paper_cache, paper_pool, take_paper
+from src.services.grading import finalize_exam
+from src.services.grading_queue import grading_workers
+from src.services.pagination import InvalidCursor, keyset_page, per_page_requested, with_total_requested
+from src.services.answer_buffer import InvalidAnswer, answer_buffer, collect_answers
 from datetime import datetime
-import random
 
 exam_bp = Blueprint('exam', __name__)
 
@@ -35,10 +40,20 @@ def start_exam():
                 'exam_id': ongoing_exam.id
             }), 400
         
-        # 创建新的考试记录
-        exam = ExamRecord(user_id=user_id)
+        # 从试卷池取一份预生成的试卷
+        paper = take_paper()
+        
+        # 创建新的考试记录，保存试卷种子、题库版本和抽到的题目ID
+        exam = ExamRecord(
+            user_id=user_id,
+            paper_seed=paper.seed,
+            bank_version=paper.bank_version,
+            paper_question_ids=encode_question_ids(paper.question_ids),
+            total_questions=len(paper.question_ids)
+        )
         db.session.add(exam)
         db.session.commit()
+        paper_cache.put(exam.id, paper)
         
         return jsonify({
             'message': '考试开始',
@@ -64,42 +79,91 @@ def get_exam_questions(exam_id):
             return jsonify({'error': '无权访问此考试'}), 403
         
         # 检查考试状态
-        if exam.status == 'completed':
+        if exam.status != 'in_progress':
             return jsonify({'error': '考试已完成'}), 400
         
-        # 按题型随机抽取题目：多选60题、判断20题、单选60题
-        multiple_questions = Question.query.filter_by(question_type='multiple').all()
-        judge_questions = Question.query.filter_by(question_type='judge').all()
-        single_questions = Question.query.filter_by(question_type='single').all()
+        # 按考试记录中保存的题目ID生成试卷，同一场考试重复获取时直接使用缓存的试卷
+        paper = get_exam_paper(exam)
         
-        selected_questions = []
+        # 更新考试的总题目数
+        exam.total_questions = len(paper.question_ids)
+        if db.session.is_modified(exam):
+            db.session.commit()
         
-        # 随机选择题目
-        if len(multiple_questions) >= 60:
-            selected_questions.extend(random.sample(multiple_questions, 60))
-        else:
-            selected_questions.extend(multiple_questions)
+        # 题目部分已预先编码，直接拼接响应
+        body = b'{"exam":' + current_app.json.dumps(exam.to_dict()).encode('utf-8') + b',"questions":' + paper.questions_json + b'}'
+        return current_app.response_class(body, status=200, mimetype='application/json')
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@exam_bp.route('/exam/<int:exam_id>/answer', methods=['POST'])
+def save_answer(exam_id):
+    """暂存作答（可提交单题或多题）"""
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': '未登录'}), 401
         
-        if len(judge_questions) >= 20:
-            selected_questions.extend(random.sample(judge_questions, 20))
-        else:
-            selected_questions.extend(judge_questions)
+        exam = ExamRecord.query.get_or_404(exam_id)
         
-        if len(single_questions) >= 60:
-            selected_questions.extend(random.sample(single_questions, 60))
-        else:
-            selected_questions.extend(single_questions)
+        # 检查考试是否属于当前用户
+        if exam.user_id != session['user_id']:
+            return jsonify({'error': '无权访问此考试'}), 403
         
-        # 打乱题目顺序
-        random.shuffle(selected_questions)
+        # 检查考试状态
+        if exam.status != 'in_progress':
+            return jsonify({'error': '考试已完成'}), 400
         
-        # 更新考试的总题目数
-        exam.total_questions = len(selected_questions)
-        db.session.commit()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': '请求格式错误'}), 400
+        answers = data.get('answers') or [data]
+        if not isinstance(answers, list):
+            return jsonify({'error': 'answers 必须是列表'}), 400
+        
+        # 只接受本场考试试卷中的题目
+        paper_question_ids = set(get_exam_paper(exam).question_ids)
+        if db.session.is_modified(exam):
+            db.session.commit()
+        try:
+            pending = collect_answers(answers, paper_question_ids)
+        except InvalidAnswer as e:
+            return jsonify({'error': str(e)}), 400
+        
+        answer_buffer.put(exam_id, pending)
         
         return jsonify({
-            'exam': exam.to_dict(),
-            'questions': [q.to_dict() for q in selected_questions]
+            'message': '答案已保存',
+            'saved_count': len(pending)
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@exam_bp.route('/exam/<int:exam_id>/answers', methods=['GET'])
+def get_saved_answers(exam_id):
+    """获取已暂存的作答，用于恢复考试"""
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': '未登录'}), 401
+        
+        exam = ExamRecord.query.get_or_404(exam_id)
+        
+        # 检查考试是否属于当前用户
+        if exam.user_id != session['user_id']:
+            return jsonify({'error': '无权访问此考试'}), 403
+        
+        saved = dict(db.session.query(
+            AnswerRecord.question_id,
+            AnswerRecord.user_answer
+        ).filter_by(exam_id=exam_id).all())
+        saved.update(answer_buffer.pending_answers(exam_id))
+        
+        return jsonify({
+            'answers': [
+                {'question_id': question_id, 'answer': user_answer}
+                for question_id, user_answer in saved.items()
+            ]
         }), 200
     
     except Exception as e:
@@ -119,83 +183,55 @@ def submit_exam(exam_id):
             return jsonify({'error': '无权访问此考试'}), 403
         
         # 检查考试状态
-        if exam.status == 'completed':
+        if exam.status != 'in_progress':
             return jsonify({'error': '考试已完成'}), 400
         
-        data = request.get_json()
+        # 交卷时附带的答案（前端附带全部答案，以防逐题暂存丢失）先并入暂存区
+        data = request.get_json(silent=True) or {}
         answers = data.get('answers', [])
-        
-        correct_count = 0
-        answer_records = []
-        
-        # 处理每个答案
-        for answer_data in answers:
-            question_id = answer_data.get('question_id')
-            user_answer = answer_data.get('answer')
-            
-            question = Question.query.get(question_id)
-            if not question:
-                continue
-            
-            # 判断答案是否正确
-            is_correct = False
-            if question.question_type == 'multiple':
-                # 多选题需要完全匹配
-                correct_answers = set(question.correct_answer.split(','))
-                user_answers = set(user_answer.split(',')) if user_answer else set()
-                is_correct = correct_answers == user_answers
-            else:
-                # 单选题和判断题
-                is_correct = user_answer == question.correct_answer
-            
-            if is_correct:
-                correct_count += 1
-            else:
-                # 添加到错题本
-                wrong_question = WrongQuestion.query.filter_by(
-                    user_id=session['user_id'],
-                    question_id=question_id
-                ).first()
-                
-                if wrong_question:
-                    wrong_question.wrong_count += 1
-                    wrong_question.last_wrong_time = datetime.utcnow()
-                    wrong_question.is_mastered = False
-                else:
-                    wrong_question = WrongQuestion(
-                        user_id=session['user_id'],
-                        question_id=question_id
-                    )
-                    db.session.add(wrong_question)
+        if answers:
+            if not isinstance(answers, list):
+                return jsonify({'error': 'answers 必须是列表'}), 400
+            try:
+                pending = collect_answers(answers, set(get_exam_paper(exam).question_ids))
+            except InvalidAnswer as e:
+                return jsonify({'error': str(e)}), 400
+            answer_buffer.put(exam_id, pending)
+        
+        # 把尚未落库的作答写入数据库
+        answer_buffer.flush(exam_id)
+        
+        # 异步模式：只保存答案并交给后台判分，前端轮询考试结果
+        async_mode = data.get('mode', 'async' if current_app.config.get('EXAM_ASYNC_GRADING') else 'sync') == 'async'
+        # 认领考试：同时到达的多次交卷只有一次能把进行中的考试改为判分中或已完成
+        claimed = ExamRecord.query.filter_by(id=exam_id, status='in_progress').update(
+            {'status': 'grading' if async_mode else 'completed', 'end_time': datetime.utcnow()},
+            synchronize_session=False
+        )
+        if not claimed:
+            db.session.rollback()
+            return jsonify({'error': '考试已完成'}), 400
+        db.session.refresh(exam)
+        if async_mode:
+            db.session.commit()
+            ticket = grading_workers.submit(exam_id)
             
-            # 创建答题记录
-            answer_record = AnswerRecord(
-                exam_id=exam_id,
-                question_id=question_id,
-                user_answer=user_answer,
-                is_correct=is_correct
-            )
-            answer_records.append(answer_record)
-            db.session.add(answer_record)
-        
-        # 计算分数
-        total_questions = len(answers)
-        score = (correct_count / total_questions) * 100 if total_questions > 0 else 0
-        
-        # 更新考试记录
-        exam.end_time = datetime.utcnow()
-        exam.correct_count = correct_count
-        exam.score = score
-        exam.status = 'completed'
+            return jsonify({
+                'message': '考试已提交，正在判分',
+                'exam': exam.to_dict(),
+                'ticket': ticket
+            }), 202
         
+        # 对已保存的答案批量判分并更新错题本，与认领在同一事务中提交
+        score = finalize_exam(exam)
         db.session.commit()
         
         return jsonify({
             'message': '考试提交成功',
             'exam': exam.to_dict(),
             'score': score,
-            'correct_count': correct_count,
-            'total_questions': total_questions
+            'correct_count': exam.correct_count,
+            'total_questions': exam.total_questions
         }), 200
     
     except Exception as e:
@@ -215,6 +251,13 @@ def get_exam_result(exam_id):
         if exam.user_id != session['user_id']:
             return jsonify({'error': '无权访问此考试'}), 403
         
+        # 异步判分尚未完成
+        if exam.status == 'grading':
+            return jsonify({
+                'message': '正在判分',
+                'exam': exam.to_dict()
+            }), 202
+        
         # 获取答题记录
         answer_records = AnswerRecord.query.filter_by(exam_id=exam_id).all()
         
@@ -234,20 +277,43 @@ def get_user_exams():
             return jsonify({'error': '未登录'}), 401
         
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        exams = ExamRecord.query.filter_by(
-            user_id=session['user_id']
-        ).order_by(ExamRecord.start_time.desc()).paginate(
+        per_page = per_page_requested(request.args, default=10)
+        with_total = with_total_requested(request.args, default='after' not in request.args)
+        
+        query = ExamRecord.query.filter_by(user_id=session['user_id'])
+        
+        # 传入 after 参数（第一页传空值）时使用游标分页，按 (start_time, id) 倒序
+        if 'after' in request.args:
+            try:
+                exams, next_cursor = keyset_page(
+                    query,
+                    [ExamRecord.start_time, ExamRecord.id],
+                    after=request.args.get('after'),
+                    per_page=per_page
+                )
+            except InvalidCursor as e:
+                return jsonify({'error': str(e)}), 400
+            
+            return jsonify({
+                'exams': [exam.to_dict() for exam in exams],
+                'next_cursor': next_cursor,
+                'total': query.count() if with_total else None
+            }), 200
+        
+        exams = query.order_by(
+            ExamRecord.start_time.desc(),
+            ExamRecord.id.desc()
+        ).paginate(
             page=page,
             per_page=per_page,
-            error_out=False
+            error_out=False,
+            count=with_total
         )
         
         return jsonify({
             'exams': [exam.to_dict() for exam in exams.items],
             'total': exams.total,
-            'pages': exams.pages,
+            'pages': exams.pages if with_total else None,
             'current_page': page
         }), 200
     
@@ -256,41 +322,60 @@ def get_user_exams():
 
 @exam_bp.route('/wrong-questions', methods=['GET'])
 def get_wrong_questions():
-    """获取错题本"""
+    """获取错题本
+
+    传入 after 参数（第一页传空值）时使用游标分页，按 (last_wrong_time, id) 倒序；
+    否则使用页码分页。with_total 控制是否统计总数，页码分页默认统计，游标分页默认不统计。
+    """
     try:
         if 'user_id' not in session:
             return jsonify({'error': '未登录'}), 401
         
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        per_page = per_page_requested(request.args, default=20)
         show_mastered = request.args.get('show_mastered', 'false').lower() == 'true'
+        with_total = with_total_requested(request.args, default='after' not in request.args)
         
-        query = WrongQuestion.query.filter_by(user_id=session['user_id'])
+        # 错题与题目详情一次联表查询
+        query = db.session.query(WrongQuestion, Question).join(
+            Question, Question.id == WrongQuestion.question_id
+        ).filter(WrongQuestion.user_id == session['user_id'])
         
         if not show_mastered:
-            query = query.filter_by(is_mastered=False)
+            query = query.filter(WrongQuestion.is_mastered == False)
+        
+        if 'after' in request.args:
+            try:
+                rows, next_cursor = keyset_page(
+                    query,
+                    [WrongQuestion.last_wrong_time, WrongQuestion.id],
+                    after=request.args.get('after'),
+                    per_page=per_page,
+                    row_values=lambda row: [row[0].last_wrong_time, row[0].id]
+                )
+            except InvalidCursor as e:
+                return jsonify({'error': str(e)}), 400
+            
+            return jsonify({
+                'wrong_questions': [dict(wq.to_dict(), question=question.to_dict()) for wq, question in rows],
+                'next_cursor': next_cursor,
+                'total': query.count() if with_total else None
+            }), 200
         
         wrong_questions = query.order_by(
-            WrongQuestion.last_wrong_time.desc()
+            WrongQuestion.last_wrong_time.desc(),
+            WrongQuestion.id.desc()
         ).paginate(
             page=page,
             per_page=per_page,
-            error_out=False
+            error_out=False,
+            count=with_total
         )
         
-        # 获取题目详情
-        result = []
-        for wq in wrong_questions.items:
-            question = Question.query.get(wq.question_id)
-            if question:
-                item = wq.to_dict()
-                item['question'] = question.to_dict()
-                result.append(item)
-        
         return jsonify({
-            'wrong_questions': result,
+            'wrong_questions': [dict(wq.to_dict(), question=question.to_dict()) for wq, question in wrong_questions.items],
             'total': wrong_questions.total,
-            'pages': wrong_questions.pages,
+            'pages': wrong_questions.pages if with_total else None,
             'current_page': page
         }), 200
     
@@ -319,3 +404,12 @@ def mark_as_mastered(wrong_question_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+
+@exam_bp.route('/admin/exam/paper-pool', methods=['GET'])
+def get_paper_pool_stats():
+    """获取试卷池状态与命中率"""
+    auth_check = require_admin()
+    if auth_check:
+        return auth_check
+    
+    return jsonify(paper_pool.stats()), 200
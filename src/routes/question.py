@@ -1,13 +1,27 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session, current_app
+from sqlalchemy.exc import IntegrityError
 from src.models.user import db
 from src.models.question import Question
-import pandas as pd
-import io
-import random
-import re
+from src.services import bank_events
+from src.services.question_index import draw_question_ids, load_questions
+from src.services.excel_import import IMPORT_MODES, spool_upload
+from src.services.import_jobs import FINISHED_STATUSES, import_jobs
+from src.services.question_export import EXPORT_FORMATS, iter_export
+from src.services.question_search import question_search
+from src.services.question_stats import question_stats
+from src.services.near_duplicates import minhash_signature, near_duplicates, similarity
+from src.services.response_cache import bank_cached
+from src.services.pagination import InvalidCursor, keyset_page, per_page_requested, with_total_requested
+from datetime import datetime
 
 question_bp = Blueprint('question', __name__)
 
+# 批量接口每次最多处理的操作数
+MAX_BATCH_OPERATIONS = 1000
+BATCH_ACTIONS = ('create', 'update', 'delete')
+# 新增题目的必填字段（数据库中不可为空）
+REQUIRED_FIELDS = ('question_text', 'question_type', 'correct_answer')
+
 def require_admin():
     """检查管理员权限"""
     if 'user_id' not in session:
@@ -16,65 +30,40 @@ def require_admin():
         return jsonify({'error': '需要管理员权限'}), 403
     return None
 
-def clean_text(text):
-    """清理文本内容"""
-    if pd.isna(text) or text is None:
-        return ""
-    text = str(text).strip()
-    # 去除多余的空白字符
-    text = re.sub(r'\s+', ' ', text)
-    return text
-
-def detect_question_type(question_text):
-    """根据题目内容检测题型"""
-    question_text = question_text.lower()
-    
-    # 判断题关键词
-    judge_keywords = ['判断', '对错', '正确', '错误', '是否', '√', '×', 'true', 'false', '（判断）', '(判断)']
-    if any(keyword in question_text for keyword in judge_keywords):
-        return 'judge'
-    
-    # 多选题关键词
-    multiple_keywords = ['多选', '选择', '（多选）', '(多选)', '以下哪些', '包括哪些']
-    if any(keyword in question_text for keyword in multiple_keywords):
-        return 'multiple'
-    
-    # 默认为单选题
-    return 'single'
-
-def parse_options(row, start_col=1, end_col=5):
-    """解析选项"""
-    options = {}
-    option_labels = ['A', 'B', 'C', 'D', 'E', 'F']
-    
-    for i, label in enumerate(option_labels[:end_col-start_col]):
-        col_index = start_col + i
-        if col_index < len(row):
-            option_text = clean_text(row[col_index])
-            if option_text:
-                options[f'option_{label.lower()}'] = option_text
-    
-    return options
+def build_question(data):
+    """按请求数据创建题目对象（未加入会话）"""
+    return Question(
+        question_text=data.get('question_text'),
+        question_type=data.get('question_type'),
+        option_a=data.get('option_a'),
+        option_b=data.get('option_b'),
+        option_c=data.get('option_c'),
+        option_d=data.get('option_d'),
+        correct_answer=data.get('correct_answer'),
+        explanation=data.get('explanation'),
+        difficulty=data.get('difficulty', 1),
+        content_hash=Question.compute_content_hash(data.get('question_text')),
+        minhash=minhash_signature(data.get('question_text'))
+    )
 
-def parse_correct_answer(answer_text):
-    """解析正确答案"""
-    if pd.isna(answer_text) or answer_text is None:
-        return 'A'
-    
-    answer_text = str(answer_text).strip().upper()
-    
-    # 处理多种答案格式
-    if ',' in answer_text or '，' in answer_text:
-        # 多选题答案
-        return answer_text.replace('，', ',')
-    elif len(answer_text) == 1 and answer_text in 'ABCDEF':
-        return answer_text
-    elif '正确' in answer_text or '对' in answer_text or '√' in answer_text:
-        return '正确'
-    elif '错误' in answer_text or '错' in answer_text or '×' in answer_text:
-        return '错误'
-    else:
-        return answer_text
+def apply_question_update(question, data):
+    """按请求数据修改题目，未提供的字段保持不变，修订号加1"""
+    text_changed = data.get('question_text', question.question_text) != question.question_text
+    question.question_text = data.get('question_text', question.question_text)
+    question.question_type = data.get('question_type', question.question_type)
+    question.option_a = data.get('option_a', question.option_a)
+    question.option_b = data.get('option_b', question.option_b)
+    question.option_c = data.get('option_c', question.option_c)
+    question.option_d = data.get('option_d', question.option_d)
+    question.correct_answer = data.get('correct_answer', question.correct_answer)
+    question.explanation = data.get('explanation', question.explanation)
+    question.difficulty = data.get('difficulty', question.difficulty)
+    # 题干未修改时不重算哈希：迁移前题干重复的旧题目没有哈希，仍可修改答案、选项和解析
+    if text_changed:
+        question.content_hash = Question.compute_content_hash(question.question_text)
+    if text_changed or question.minhash is None:
+        question.minhash = minhash_signature(question.question_text)
+    question.revision = (question.revision or 1) + 1
 
 @question_bp.route('/admin/import-excel', methods=['POST'])
 def import_excel():
@@ -91,107 +80,91 @@ def import_excel():
         if file.filename == '':
             return jsonify({'error': '没有选择文件'}), 400
         
-        if not file.filename.endswith(('.xlsx', '.xls')):
-            return jsonify({'error': '只支持Excel文件(.xlsx, .xls)'}), 400
+        if not file.filename.endswith('.xlsx'):
+            return jsonify({'error': '只支持Excel文件(.xlsx)'}), 400
         
-        # 读取Excel文件
-        file_content = file.read()
+        chunk_size = request.form.get('chunk_size', current_app.config['IMPORT_CHUNK_SIZE'], type=int)
+        chunk_size = max(1, min(chunk_size, 10000))
         
-        # 尝试读取所有工作表
-        excel_file = pd.ExcelFile(io.BytesIO(file_content))
-        imported_count = 0
-        error_count = 0
-        sheets_processed = []
-        
-        for sheet_name in excel_file.sheet_names:
-            try:
-                # 读取工作表
-                df = pd.read_excel(io.BytesIO(file_content), sheet_name=sheet_name, header=None)
-                
-                # 寻找题目开始行
-                start_row = 0
-                for i, row in df.iterrows():
-                    if i > 50:  # 避免检查太多行
-                        break
-                    
-                    # 检查是否包含题目标识
-                    row_text = ' '.join([str(cell) for cell in row if pd.notna(cell)])
-                    if any(keyword in row_text for keyword in ['题目', '试题', '第1题', '1.', '1、']):
-                        start_row = i
-                        break
-                
-                sheet_count = 0
-                
-                # 从找到的起始行开始处理
-                for index, row in df.iterrows():
-                    if index < start_row:
-                        continue
-                    
-                    # 检查第一列是否有内容（题目）
-                    question_text = clean_text(row[0])
-                    if not question_text or len(question_text) < 10:
-                        continue
-                    
-                    try:
-                        # 检测题型
-                        question_type = detect_question_type(question_text)
-                        
-                        # 解析选项
-                        options = parse_options(row.values)
-                        
-                        # 解析答案（通常在最后几列）
-                        correct_answer = 'A'
-                        for col_index in range(len(row)-1, max(4, len(row)-5), -1):
-                            if col_index < len(row) and pd.notna(row[col_index]):
-                                potential_answer = clean_text(row[col_index])
-                                if potential_answer and len(potential_answer) <= 10:
-                                    correct_answer = parse_correct_answer(potential_answer)
-                                    break
-                        
-                        # 创建题目对象
-                        question = Question(
-                            question_text=question_text,
-                            question_type=question_type,
-                            option_a=options.get('option_a'),
-                            option_b=options.get('option_b'),
-                            option_c=options.get('option_c'),
-                            option_d=options.get('option_d'),
-                            correct_answer=correct_answer,
-                            difficulty=1
-                        )
-                        
-                        # 检查是否重复
-                        existing = Question.query.filter_by(question_text=question_text).first()
-                        if not existing:
-                            db.session.add(question)
-                            sheet_count += 1
-                        
-                    except Exception as e:
-                        error_count += 1
-                        continue
-                
-                if sheet_count > 0:
-                    sheets_processed.append(f"{sheet_name}: {sheet_count}题")
-                    imported_count += sheet_count
-            
-            except Exception as e:
-                continue
+        # skip: 已存在的题目跳过；upsert: 已存在的题目只更新有变化的选项和答案
+        mode = request.form.get('mode', 'skip')
+        if mode not in IMPORT_MODES:
+            return jsonify({'error': '导入模式只能是 skip 或 upsert'}), 400
+        dry_run = request.form.get('dry_run', 'false').lower() == 'true'
+        # 新题目与已有题目只差标点、空格或个别字时跳过
+        skip_near_duplicates = request.form.get('skip_near_duplicates', 'false').lower() == 'true'
         
-        # 提交所有更改
-        db.session.commit()
+        # 上传文件先落盘，由后台导入任务以只读模式流式读取
+        path = spool_upload(file)
+        job = import_jobs.submit(
+            path,
+            file.filename,
+            chunk_size,
+            mode=mode,
+            dry_run=dry_run,
+            skip_near_duplicates=skip_near_duplicates
+        )
         
         return jsonify({
-            'message': f'导入完成！成功导入 {imported_count} 道题目',
-            'imported_count': imported_count,
-            'error_count': error_count,
-            'sheets_processed': sheets_processed
-        }), 200
+            'message': '导入任务已提交',
+            'job_id': job.id,
+            'job': job.to_dict()
+        }), 202
     
     except Exception as e:
-        db.session.rollback()
         return jsonify({'error': f'导入失败: {str(e)}'}), 500
 
+@question_bp.route('/admin/import-jobs', methods=['GET'])
+def get_import_jobs():
+    """获取最近的导入任务"""
+    auth_check = require_admin()
+    if auth_check:
+        return auth_check
+    
+    try:
+        return jsonify({'jobs': import_jobs.list()}), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@question_bp.route('/admin/import-jobs/<job_id>', methods=['GET'])
+def get_import_job(job_id):
+    """获取导入任务进度"""
+    auth_check = require_admin()
+    if auth_check:
+        return auth_check
+    
+    try:
+        job = import_jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': '导入任务不存在'}), 404
+        
+        return jsonify({'job': job}), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@question_bp.route('/admin/import-jobs/<job_id>/cancel', methods=['POST'])
+def cancel_import_job(job_id):
+    """取消导入任务，已提交的分块会保留"""
+    auth_check = require_admin()
+    if auth_check:
+        return auth_check
+    
+    try:
+        job = import_jobs.cancel(job_id)
+        if job is None:
+            return jsonify({'error': '导入任务不存在'}), 404
+        if job['status'] in FINISHED_STATUSES and not job['cancel_requested']:
+            return jsonify({'error': '导入任务已结束'}), 400
+        
+        return jsonify({'message': '已请求取消导入任务', 'job': job}), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @question_bp.route('/admin/questions/stats', methods=['GET'])
+@bank_cached(auth=require_admin)
 def get_question_stats():
     """获取题库统计信息"""
     auth_check = require_admin()
@@ -199,29 +172,98 @@ def get_question_stats():
         return auth_check
     
     try:
-        total = Question.query.count()
-        single_count = Question.query.filter_by(question_type='single').count()
-        multiple_count = Question.query.filter_by(question_type='multiple').count()
-        judge_count = Question.query.filter_by(question_type='judge').count()
+        # 按题型、难度分组的单次查询结果，题库变更前一直使用缓存
+        return jsonify(question_stats.get())
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@question_bp.route('/admin/questions/near-duplicates', methods=['GET'])
+@bank_cached(auth=require_admin)
+def get_near_duplicates():
+    """近似重复题目报告：按组列出题干近似相同的题目"""
+    auth_check = require_admin()
+    if auth_check:
+        return auth_check
+    
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        limit = max(1, min(limit, 500))
+        
+        near_duplicates.ensure_built()
+        groups = near_duplicates.groups()
+        shown = groups[:limit]
+        
+        question_ids = [question_id for group in shown for question_id in group]
+        questions = {
+            question.id: question for question in
+            Question.query.filter(Question.id.in_(question_ids)).all()
+        } if question_ids else {}
+        
+        report = []
+        for group in shown:
+            first = near_duplicates.signature(group[0])
+            report.append({
+                'questions': [
+                    {
+                        'id': question_id,
+                        'question_text': questions[question_id].question_text,
+                        'question_type': questions[question_id].question_type,
+                        # 与组内第一道题的签名相似度
+                        'similarity': round(similarity(first, near_duplicates.signature(question_id)), 3)
+                    }
+                    for question_id in group if question_id in questions
+                ]
+            })
         
         return jsonify({
-            'total': total,
-            'single': single_count,
-            'multiple': multiple_count,
-            'judge': judge_count
-        })
+            'groups': report,
+            'total_groups': len(groups),
+            'total_questions': sum(len(group) for group in groups),
+            'threshold': near_duplicates.threshold
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@question_bp.route('/admin/questions/export', methods=['GET'])
+def export_questions():
+    """流式导出题库"""
+    auth_check = require_admin()
+    if auth_check:
+        return auth_check
+    
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': '只支持导出 csv、jsonl 或 xlsx 格式'}), 400
+        
+        filename = f"questions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+        return Response(
+            iter_export(db.engine, export_format),
+            content_type=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @question_bp.route('/questions', methods=['GET'])
+@bank_cached()
 def get_questions():
-    """获取题目列表"""
+    """获取题目列表
+
+    传入 after 参数（第一页传空值）时使用游标分页，按题目编号排序；否则使用页码分页。
+    with_total 控制是否统计总数，页码分页默认统计，游标分页默认不统计。
+    响应带题库版本 ETag，题库未变更时按 If-None-Match 返回 304。
+    """
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        per_page = per_page_requested(request.args, default=20)
         question_type = request.args.get('type')
         search = request.args.get('search', '')
+        keyset = 'after' in request.args
+        with_total = with_total_requested(request.args, default=not keyset)
         
         query = Question.query
         
@@ -229,18 +271,41 @@ def get_questions():
             query = query.filter_by(question_type=question_type)
         
         if search:
-            query = query.filter(Question.question_text.contains(search))
+            # 不少于3个字符时走全文索引，页码分页时按相关度排序；更短的检索词走单字索引
+            query = question_search.apply(query, search, ranked=not keyset)
+        
+        if keyset:
+            try:
+                questions, next_cursor = keyset_page(
+                    query,
+                    [Question.id],
+                    after=request.args.get('after'),
+                    per_page=per_page,
+                    descending=False
+                )
+            except InvalidCursor as e:
+                return jsonify({'error': str(e)}), 400
+            
+            return jsonify({
+                'questions': [q.to_dict() for q in questions],
+                'next_cursor': next_cursor,
+                'total': query.order_by(None).count() if with_total else None
+            }), 200
+        
+        if not search:
+            query = query.order_by(Question.id)
         
         questions = query.paginate(
             page=page, 
             per_page=per_page, 
-            error_out=False
+            error_out=False,
+            count=with_total
         )
         
         return jsonify({
             'questions': [q.to_dict() for q in questions.items],
             'total': questions.total,
-            'pages': questions.pages,
+            'pages': questions.pages if with_total else None,
             'current_page': page
         }), 200
     
@@ -254,31 +319,8 @@ def get_random_questions():
         if 'user_id' not in session:
             return jsonify({'error': '未登录'}), 401
         
-        # 按题型随机抽取题目：多选60题、判断20题、单选60题
-        multiple_questions = Question.query.filter_by(question_type='multiple').all()
-        judge_questions = Question.query.filter_by(question_type='judge').all()
-        single_questions = Question.query.filter_by(question_type='single').all()
-        
-        selected_questions = []
-        
-        # 随机选择题目
-        if len(multiple_questions) >= 60:
-            selected_questions.extend(random.sample(multiple_questions, 60))
-        else:
-            selected_questions.extend(multiple_questions)
-        
-        if len(judge_questions) >= 20:
-            selected_questions.extend(random.sample(judge_questions, 20))
-        else:
-            selected_questions.extend(judge_questions)
-        
-        if len(single_questions) >= 60:
-            selected_questions.extend(random.sample(single_questions, 60))
-        else:
-            selected_questions.extend(single_questions)
-        
-        # 打乱题目顺序
-        random.shuffle(selected_questions)
+        # 按题型从ID索引中随机抽取题目：多选60题、判断20题、单选60题
+        selected_questions = load_questions(draw_question_ids())
         
         return jsonify({
             'questions': [q.to_dict() for q in selected_questions],
@@ -298,26 +340,199 @@ def add_question():
     try:
         data = request.get_json()
         
-        question = Question(
-            question_text=data.get('question_text'),
-            question_type=data.get('question_type'),
-            option_a=data.get('option_a'),
-            option_b=data.get('option_b'),
-            option_c=data.get('option_c'),
-            option_d=data.get('option_d'),
-            correct_answer=data.get('correct_answer'),
-            explanation=data.get('explanation'),
-            difficulty=data.get('difficulty', 1)
-        )
+        question = build_question(data)
         
         db.session.add(question)
         db.session.commit()
+        bank_events.questions_saved([question])
         
         return jsonify({
             'message': '题目添加成功',
             'question': question.to_dict()
         }), 201
     
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': '题目已存在'}), 400
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@question_bp.route('/questions/batch', methods=['POST'])
+def batch_questions():
+    """批量新增、修改、删除题目
+
+    请求体 {"operations": [{"action": "create"|"update"|"delete", "id": 题目ID, "question": {...}}], "atomic": false}。
+    各项按顺序先逐项校验（题目是否存在、必填字段、题干是否与题库或前面的操作重复），
+    通过校验的操作在同一个事务中依次执行并一次提交；atomic 为 true 时任一项失败则全部不执行。
+    """
+    auth_check = require_admin()
+    if auth_check:
+        return auth_check
+    
+    try:
+        data = request.get_json() or {}
+        operations = data.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'error': 'operations 必须是非空列表'}), 400
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({'error': f'每次最多 {MAX_BATCH_OPERATIONS} 项操作'}), 400
+        atomic = bool(data.get('atomic', False))
+        
+        # 一次查询取出要修改、删除的题目
+        target_ids = {
+            operation.get('id') for operation in operations
+            if isinstance(operation, dict) and isinstance(operation.get('id'), int)
+        }
+        questions = {
+            question.id: question for question in
+            Question.query.filter(Question.id.in_(target_ids)).all()
+        } if target_ids else {}
+        
+        # 新题干与题库中已有题目的内容哈希是否冲突，一次查询取出
+        new_hashes = {
+            Question.compute_content_hash(operation['question'].get('question_text'))
+            for operation in operations
+            if isinstance(operation, dict) and isinstance(operation.get('question'), dict)
+            and operation['question'].get('question_text') is not None
+        }
+        owners = dict(db.session.query(Question.content_hash, Question.id).filter(
+            Question.content_hash.in_(new_hashes)
+        ).all()) if new_hashes else {}
+        # 题目在本批次执行到当前操作时的题干和内容哈希（迁移前题干重复的旧题目哈希为空）
+        current_texts = {question.id: question.question_text for question in questions.values()}
+        current_hashes = {question.id: question.content_hash for question in questions.values()}
+        for question_id, content_hash in current_hashes.items():
+            if content_hash is not None:
+                owners[content_hash] = question_id
+        
+        results = []
+        planned = []
+        deleted = set()
+        for index, operation in enumerate(operations):
+            result = {'index': index}
+            results.append(result)
+            if not isinstance(operation, dict):
+                result['error'] = '操作格式错误'
+                continue
+            
+            action = operation.get('action')
+            result['action'] = action
+            fields = operation.get('question') or {}
+            if action not in BATCH_ACTIONS:
+                result['error'] = '操作只能是 create、update 或 delete'
+                continue
+            if not isinstance(fields, dict):
+                result['error'] = 'question 必须是对象'
+                continue
+            
+            if action == 'create':
+                missing = [field for field in REQUIRED_FIELDS if fields.get(field) is None]
+                if missing:
+                    result['error'] = f"缺少必填字段: {', '.join(missing)}"
+                    continue
+                content_hash = Question.compute_content_hash(fields['question_text'])
+                if content_hash in owners:
+                    result['error'] = '题目已存在'
+                    continue
+                # 本批次新增的题目还没有ID，用操作序号占位
+                owners[content_hash] = ('new', index)
+                planned.append((result, action, None, fields))
+                continue
+            
+            question_id = operation.get('id')
+            result['id'] = question_id
+            question = questions.get(question_id)
+            if question is None or question_id in deleted:
+                result['error'] = '题目不存在'
+                continue
+            
+            if action == 'delete':
+                deleted.add(question_id)
+                if owners.get(current_hashes[question_id]) == question_id:
+                    del owners[current_hashes[question_id]]
+                planned.append((result, action, question, None))
+                continue
+            
+            if any(fields.get(field, '') is None for field in REQUIRED_FIELDS):
+                result['error'] = f"必填字段不能为空: {', '.join(REQUIRED_FIELDS)}"
+                continue
+            # 与 apply_question_update 一致：题干未修改时保留原哈希
+            question_text = fields.get('question_text', current_texts[question_id])
+            if question_text == current_texts[question_id]:
+                content_hash = current_hashes[question_id]
+            else:
+                content_hash = Question.compute_content_hash(question_text)
+            if content_hash is not None and owners.get(content_hash, question_id) != question_id:
+                result['error'] = '题目已存在'
+                continue
+            if owners.get(current_hashes[question_id]) == question_id:
+                del owners[current_hashes[question_id]]
+            if content_hash is not None:
+                owners[content_hash] = question_id
+            current_texts[question_id] = question_text
+            current_hashes[question_id] = content_hash
+            planned.append((result, action, question, fields))
+        
+        failed = sum(1 for result in results if 'error' in result)
+        if atomic and failed:
+            db.session.rollback()
+            return jsonify({
+                'error': f'{failed} 项操作未通过校验，未执行任何操作',
+                'results': results
+            }), 400
+        
+        # 按请求顺序执行，每项 flush 一次保证唯一索引检查与校验顺序一致，最后一次提交
+        saved = []
+        deleted_ids = []
+        for result, action, question, fields in planned:
+            try:
+                if action == 'create':
+                    question = build_question(fields)
+                    db.session.add(question)
+                    db.session.flush()
+                    result['id'] = question.id
+                    result['status'] = 'created'
+                    saved.append(question)
+                elif action == 'update':
+                    apply_question_update(question, fields)
+                    db.session.flush()
+                    result['status'] = 'updated'
+                    saved.append(question)
+                else:
+                    db.session.delete(question)
+                    db.session.flush()
+                    result['status'] = 'deleted'
+                    deleted_ids.append(question.id)
+            except IntegrityError:
+                # 校验时未能发现的冲突（如并发写入的题目）：整批回滚并指出出错的操作
+                db.session.rollback()
+                return jsonify({
+                    'error': f"第 {result['index']} 项操作与已有题目重复，未执行任何操作",
+                    'index': result['index']
+                }), 400
+        
+        saved_ids = [question.id for question in saved if question.id not in deleted_ids]
+        db.session.commit()
+        if saved_ids:
+            # 提交后对象已过期，一次查询重新加载，避免逐个刷新
+            bank_events.questions_saved(Question.query.filter(Question.id.in_(saved_ids)).all())
+        if deleted_ids:
+            bank_events.questions_deleted(deleted_ids)
+        
+        return jsonify({
+            'results': results,
+            'created': sum(1 for result in results if result.get('status') == 'created'),
+            'updated': sum(1 for result in results if result.get('status') == 'updated'),
+            'deleted': len(deleted_ids),
+            'failed': failed
+        }), 200
+    
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': '题目已存在，未执行任何操作'}), 400
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -333,23 +548,20 @@ def update_question(question_id):
         question = Question.query.get_or_404(question_id)
         data = request.get_json()
         
-        question.question_text = data.get('question_text', question.question_text)
-        question.question_type = data.get('question_type', question.question_type)
-        question.option_a = data.get('option_a', question.option_a)
-        question.option_b = data.get('option_b', question.option_b)
-        question.option_c = data.get('option_c', question.option_c)
-        question.option_d = data.get('option_d', question.option_d)
-        question.correct_answer = data.get('correct_answer', question.correct_answer)
-        question.explanation = data.get('explanation', question.explanation)
-        question.difficulty = data.get('difficulty', question.difficulty)
+        apply_question_update(question, data)
         
         db.session.commit()
+        bank_events.questions_saved([question])
         
         return jsonify({
             'message': '题目更新成功',
             'question': question.to_dict()
         }), 200
     
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': '题目已存在'}), 400
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -365,6 +577,7 @@ def delete_question(question_id):
         question = Question.query.get_or_404(question_id)
         db.session.delete(question)
         db.session.commit()
+        bank_events.questions_deleted([question_id])
         
         return jsonify({'message': '题目删除成功'}), 200
     
@@ -382,6 +595,7 @@ def clear_questions():
     try:
         deleted_count = Question.query.delete()
         db.session.commit()
+        bank_events.bank_cleared()
         
         return jsonify({
             'message': f'已清空题库，删除了 {deleted_count} 道题目',
@@ -0,0 +1,57 @@
+from flask import Blueprint, request, jsonify, session
+from src.models.user import db
+from src.services.answer_buffer import InvalidAnswer, collect_answers
+from src.services.review import apply_reviews, due_reviews
+
+review_bp = Blueprint('review', __name__)
+
+@review_bp.route('/review/next', methods=['GET'])
+def get_next_reviews():
+    """获取到期需要复习的错题"""
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': '未登录'}), 401
+        
+        n = min(max(request.args.get('n', 20, type=int), 1), 100)
+        
+        items = []
+        for wq, question in due_reviews(session['user_id'], limit=n):
+            item = wq.to_dict()
+            item['question'] = question.to_exam_dict()
+            items.append(item)
+        
+        return jsonify({
+            'reviews': items,
+            'count': len(items)
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@review_bp.route('/review/answers', methods=['POST'])
+def submit_review_answers():
+    """提交复习作答，批量更新复习计划"""
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': '未登录'}), 401
+        
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': '请求格式错误'}), 400
+        try:
+            answers = list(collect_answers(data.get('answers', [])).items())
+        except InvalidAnswer as e:
+            return jsonify({'error': str(e)}), 400
+        
+        results = apply_reviews(session['user_id'], answers)
+        db.session.commit()
+        
+        return jsonify({
+            'message': '复习记录已更新',
+            'results': results,
+            'correct_count': sum(1 for result in results if result['is_correct'])
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
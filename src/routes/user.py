@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request, session
 from src.models.user import User, db
+from src.services.pagination import InvalidCursor, keyset_page, per_page_requested, with_total_requested
 
 user_bp = Blueprint('user', __name__)
 
@@ -25,18 +26,39 @@ def get_users():
         return auth_check
     
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = per_page_requested(request.args, default=20)
+    with_total = with_total_requested(request.args, default='after' not in request.args)
+    
+    # 传入 after 参数（第一页传空值）时使用游标分页，按用户编号排序
+    if 'after' in request.args:
+        try:
+            users, next_cursor = keyset_page(
+                User.query,
+                [User.id],
+                after=request.args.get('after'),
+                per_page=per_page,
+                descending=False
+            )
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'users': [user.to_dict() for user in users],
+            'next_cursor': next_cursor,
+            'total': User.query.count() if with_total else None
+        })
     
-    users = User.query.paginate(
+    users = User.query.order_by(User.id).paginate(
         page=page, 
         per_page=per_page, 
-        error_out=False
+        error_out=False,
+        count=with_total
     )
     
     return jsonify({
         'users': [user.to_dict() for user in users.items],
         'total': users.total,
-        'pages': users.pages,
+        'pages': users.pages if with_total else None,
         'current_page': page
     })
 
@@ -0,0 +1,189 @@
+"""考试作答暂存
+
+考生每作答一题就提交到这里。默认直接写入 AnswerRecord（write-through）；
+开启 write-behind 后答案先写入进程内缓冲区，由后台线程定时或在积压达到阈值时按考试批量写入，
+交卷前会先把该场考试的缓冲答案写入数据库。
+
+缓冲区只在本进程内可见，交卷请求由其他进程处理时看不到这些答案，
+因此 write-behind 只能用于单进程部署（ANSWER_WRITE_BEHIND=true）。
+"""
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, bindparam
+from src.models.user import db
+from src.models.exam import AnswerRecord
+
+class InvalidAnswer(ValueError):
+    """作答的题目ID或答案格式无效"""
+
+class AnswerBuffer:
+    def __init__(self, flush_interval=2.0, flush_size=500, max_attempts=3):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_attempts = max_attempts
+        self.write_behind = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = {}  # (exam_id, question_id) -> (user_answer, answer_time)
+        self._failures = {}  # exam_id -> 连续写入失败次数
+        self._thread = None
+
+    def init_app(self, app):
+        """读取配置，开启 write-behind 时启动后台写入线程"""
+        self.flush_interval = app.config.get('ANSWER_FLUSH_INTERVAL', self.flush_interval)
+        self.flush_size = app.config.get('ANSWER_FLUSH_SIZE', self.flush_size)
+        self.write_behind = app.config.get('ANSWER_WRITE_BEHIND', self.write_behind)
+        if not self.write_behind or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(app,), name='answer-buffer', daemon=True)
+        self._thread.start()
+
+    def put(self, exam_id, answers):
+        """暂存作答：answers 为 {question_id: user_answer}"""
+        now = datetime.utcnow()
+        if not self.write_behind:
+            entries = {(exam_id, question_id): (user_answer, now) for question_id, user_answer in answers.items()}
+            try:
+                self._write(entries)
+            except Exception:
+                db.session.rollback()
+                raise
+            return
+        with self._lock:
+            for question_id, user_answer in answers.items():
+                self._pending[(exam_id, question_id)] = (user_answer, now)
+            backlog = len(self._pending)
+        if backlog >= self.flush_size:
+            self._wakeup.set()
+
+    def pending_answers(self, exam_id):
+        """获取某场考试尚未写入数据库的答案"""
+        with self._lock:
+            return {
+                question_id: value[0]
+                for (pending_exam_id, question_id), value in self._pending.items()
+                if pending_exam_id == exam_id
+            }
+
+    def flush(self, exam_id=None):
+        """把缓冲区中的答案按考试批量写入数据库，exam_id 为空时写入全部考试
+
+        每场考试单独写入并提交，一场考试写入失败不影响其他考试。
+        失败的答案放回缓冲区重试，同一场考试连续失败 max_attempts 次后丢弃并记录日志。
+        指定 exam_id 时写入失败会抛出异常。
+        """
+        with self._flush_lock:
+            with self._lock:
+                if exam_id is None:
+                    entries = self._pending
+                    self._pending = {}
+                else:
+                    keys = [key for key in self._pending if key[0] == exam_id]
+                    entries = {key: self._pending.pop(key) for key in keys}
+            
+            by_exam = {}
+            for key, value in entries.items():
+                by_exam.setdefault(key[0], {})[key] = value
+            
+            written = 0
+            for pending_exam_id, exam_entries in by_exam.items():
+                try:
+                    self._write(exam_entries)
+                except Exception:
+                    db.session.rollback()
+                    self._requeue(pending_exam_id, exam_entries)
+                    if exam_id is not None:
+                        raise
+                    current_app.logger.exception('考试 %s 的暂存作答写入失败', pending_exam_id)
+                    continue
+                self._failures.pop(pending_exam_id, None)
+                written += len(exam_entries)
+            return written
+
+    def _requeue(self, exam_id, entries):
+        attempts = self._failures.get(exam_id, 0) + 1
+        if attempts >= self.max_attempts:
+            self._failures.pop(exam_id, None)
+            current_app.logger.error(
+                '考试 %s 的暂存作答连续 %s 次写入失败，已丢弃: %r',
+                exam_id, attempts, {question_id: value[0] for (_, question_id), value in entries.items()}
+            )
+            return
+        self._failures[exam_id] = attempts
+        # 放回缓冲区，已有更新的答案不覆盖
+        with self._lock:
+            for key, value in entries.items():
+                self._pending.setdefault(key, value)
+
+    def _write(self, entries):
+        table = AnswerRecord.__table__
+        keys = [{'b_exam_id': exam_id, 'b_question_id': question_id} for exam_id, question_id in entries]
+        rows = [
+            {
+                'exam_id': exam_id,
+                'question_id': question_id,
+                'user_answer': user_answer,
+                'is_correct': False,
+                'answer_time': answer_time
+            }
+            for (exam_id, question_id), (user_answer, answer_time) in entries.items()
+        ]
+        
+        # 同一题重复作答时以最新答案覆盖旧记录
+        db.session.execute(
+            table.delete().where(and_(
+                table.c.exam_id == bindparam('b_exam_id'),
+                table.c.question_id == bindparam('b_question_id')
+            )),
+            keys
+        )
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+
+    def _run(self, app):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                with app.app_context():
+                    self.flush()
+            except Exception:
+                app.logger.exception('作答暂存写入失败')
+
+answer_buffer = AnswerBuffer()
+
+def normalize_answer(user_answer):
+    """多选题答案可以是选项数组，统一保存为逗号分隔的字符串"""
+    if isinstance(user_answer, (list, tuple)):
+        return ','.join(sorted(str(option) for option in user_answer))
+    return user_answer
+
+def collect_answers(answers, paper_question_ids=None):
+    """校验请求中的作答并转为 {question_id: user_answer}
+
+    answers 必须是列表；题目ID必须是整数（或数字字符串），传入 paper_question_ids 时还必须是本场试卷中的题目；
+    答案必须是字符串、字符串数组或 null，否则抛出 InvalidAnswer。
+    """
+    if not isinstance(answers, list):
+        raise InvalidAnswer('answers 必须是列表')
+    collected = {}
+    for answer_data in answers:
+        if not isinstance(answer_data, dict):
+            raise InvalidAnswer('作答格式错误')
+        question_id = answer_data.get('question_id')
+        if isinstance(question_id, str) and question_id.isdigit():
+            question_id = int(question_id)
+        if type(question_id) is not int:
+            raise InvalidAnswer(f'题目 {question_id} 的编号无效')
+        if paper_question_ids is not None and question_id not in paper_question_ids:
+            raise InvalidAnswer(f'题目 {question_id} 不在本场考试中')
+        user_answer = answer_data.get('answer')
+        if isinstance(user_answer, (list, tuple)) and not all(isinstance(option, str) for option in user_answer):
+            raise InvalidAnswer(f'题目 {question_id} 的答案格式无效')
+        user_answer = normalize_answer(user_answer)
+        if user_answer is not None and not isinstance(user_answer, str):
+            raise InvalidAnswer(f'题目 {question_id} 的答案格式无效')
+        collected[question_id] = user_answer
+    return collected
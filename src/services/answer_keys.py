@@ -0,0 +1,95 @@
+"""编译后的答案键缓存
+
+单选、多选答案编码为选项位掩码（A=1, B=2, C=4 ...），判断题编码为布尔值（正确=1，错误=0）。
+无法编码的答案（如自定义文本）记为 UNCOMPILED，判分时回退到逐题字符串比较。
+"""
+import threading
+import numpy as np
+from src.models.user import db
+from src.models.question import Question
+
+OPTION_BITS = {label: 1 << i for i, label in enumerate('ABCDEF')}
+JUDGE_VALUES = {'正确': 1, '错误': 0}
+
+# 答案键无法编码，需要回退到字符串比较
+UNCOMPILED = -2
+# 作答内容无法编码，必然与任何已编码答案键不相等
+INVALID = -1
+
+def encode_answer(question_type, answer):
+    """把答案编码为整数，规则与 grading.is_answer_correct 保持一致"""
+    if not isinstance(answer, str):
+        return None
+    if question_type == 'multiple':
+        if not answer:
+            return 0
+        mask = 0
+        for label in answer.split(','):
+            bit = OPTION_BITS.get(label)
+            if bit is None:
+                return None
+            mask |= bit
+        return mask
+    if question_type == 'judge':
+        return JUDGE_VALUES.get(answer)
+    return OPTION_BITS.get(answer)
+
+def compile_key(question_type, correct_answer):
+    """编译题目的正确答案"""
+    mask = encode_answer(question_type, correct_answer)
+    # 多选题空答案键在原规则下不会与任何作答相等，同样回退比较
+    if mask is None or (question_type == 'multiple' and mask == 0):
+        return UNCOMPILED
+    return mask
+
+def encode_submitted(question_type, user_answer):
+    """编码考生作答"""
+    if question_type == 'multiple' and not user_answer:
+        return 0
+    mask = encode_answer(question_type, user_answer)
+    return INVALID if mask is None else mask
+
+class AnswerKeyStore:
+    """进程内答案键缓存：{question_id: (question_type, correct_answer, key_mask)}"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = {}
+
+    def get_many(self, question_ids):
+        """批量获取答案键，缓存中缺失的用一次 IN 查询加载"""
+        with self._lock:
+            found = {qid: self._keys[qid] for qid in question_ids if qid in self._keys}
+        missing = [qid for qid in question_ids if qid not in found]
+        if missing:
+            rows = db.session.query(
+                Question.id,
+                Question.question_type,
+                Question.correct_answer
+            ).filter(Question.id.in_(missing)).all()
+            loaded = {
+                question_id: (question_type, correct_answer, compile_key(question_type, correct_answer))
+                for question_id, question_type, correct_answer in rows
+            }
+            with self._lock:
+                self._keys.update(loaded)
+            found.update(loaded)
+        return found
+
+    def invalidate(self, question_ids):
+        """题目修改或删除后移除对应答案键"""
+        with self._lock:
+            for question_id in question_ids:
+                self._keys.pop(question_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._keys = {}
+
+answer_keys = AnswerKeyStore()
+
+def grade_masks(key_masks, submitted_masks):
+    """向量化比较整份答卷，返回每题是否正确的布尔数组"""
+    keys = np.asarray(key_masks, dtype=np.int16)
+    submitted = np.asarray(submitted_masks, dtype=np.int16)
+    return (keys == submitted) & (keys >= 0)
@@ -0,0 +1,99 @@
+"""题库变更通知
+
+题目新增、修改、删除、导入或清空并提交之后调用这里的函数，
+由这里统一同步各个进程内的索引与缓存，并递增题库版本号。
+
+其他进程修改题库后本进程的索引与缓存不会收到通知：每个请求和判分任务开始前调用 sync()，
+数据库中的版本号与进程内的不同时清除本进程的全部索引与缓存，索引在下次使用时从数据库重建。
+"""
+from src.services.bank_version import bank_version
+from src.services.question_index import question_index
+from src.services.answer_keys import answer_keys
+from src.services.exam_papers import paper_pool
+from src.services.question_fragments import fragment_cache
+from src.services.question_stats import question_stats
+from src.services.near_duplicates import near_duplicates
+from src.services.response_cache import response_cache
+
+def questions_saved(questions):
+    """题目新增或修改后调用"""
+    for question in questions:
+        question_index.add(question.id, question.question_type)
+        near_duplicates.add(question.id, question.minhash)
+    answer_keys.invalidate([question.id for question in questions])
+    fragment_cache.invalidate([question.id for question in questions])
+    _bump()
+    paper_pool.invalidate()
+    question_stats.invalidate()
+    response_cache.clear()
+
+def questions_deleted(question_ids):
+    """题目删除后调用"""
+    for question_id in question_ids:
+        question_index.remove(question_id)
+        near_duplicates.remove(question_id)
+    answer_keys.invalidate(question_ids)
+    fragment_cache.invalidate(question_ids)
+    _bump()
+    paper_pool.invalidate()
+    question_stats.invalidate()
+    response_cache.clear()
+
+def bank_reloaded():
+    """批量导入等大范围变更后调用，整体重建"""
+    question_index.rebuild()
+    near_duplicates.rebuild()
+    answer_keys.clear()
+    fragment_cache.clear()
+    _bump()
+    paper_pool.invalidate()
+    question_stats.invalidate()
+    response_cache.clear()
+
+def chunk_imported(updated_ids, inserted):
+    """导入任务每提交一块后调用
+
+    变更题目的答案键和片段立即失效，有新增题目时题型索引在下次使用时重建；
+    近似重复索引在整个导入结束后由 bank_reloaded() 重建。
+    """
+    if inserted:
+        question_index.invalidate()
+    answer_keys.invalidate(updated_ids)
+    fragment_cache.invalidate(updated_ids)
+    _bump()
+    paper_pool.invalidate()
+    question_stats.invalidate()
+    response_cache.clear()
+
+def bank_cleared():
+    """清空题库后调用"""
+    question_index.clear()
+    near_duplicates.clear()
+    answer_keys.clear()
+    fragment_cache.clear()
+    _bump()
+    paper_pool.invalidate()
+    question_stats.invalidate()
+    response_cache.clear()
+
+def sync():
+    """读取数据库中的题库版本号，其他进程修改过题库时清除本进程的索引与缓存"""
+    version = bank_version.stored()
+    if version is not None and version != bank_version.current:
+        _invalidate_local()
+        bank_version.set(version)
+
+def _bump():
+    previous = bank_version.current
+    if bank_version.bump() != previous + 1:
+        # 上次同步之后其他进程也修改过题库
+        _invalidate_local()
+
+def _invalidate_local():
+    question_index.invalidate()
+    near_duplicates.invalidate()
+    answer_keys.clear()
+    fragment_cache.clear()
+    paper_pool.invalidate()
+    question_stats.invalidate()
+    response_cache.clear()
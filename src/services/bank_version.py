@@ -0,0 +1,57 @@
+"""题库版本号
+
+题库每次变更后递增并持久化到数据库，进程内缓存当前值。
+多进程部署时其他进程也会修改题库，每个请求开始时由 bank_events.sync() 读取数据库中的版本号，
+与进程内的值不同时清除本进程的索引与缓存。
+"""
+import threading
+from sqlalchemy import select
+from src.models.user import db
+from src.models.question import QuestionBankVersion
+
+# 每个请求都会执行，使用 Core 语句省去 ORM 查询的构造开销
+_STORED_VERSION = select(QuestionBankVersion.__table__.c.version).where(QuestionBankVersion.__table__.c.id == 1)
+
+class BankVersion:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+
+    def load(self):
+        """读取数据库中的版本号，不存在时初始化为0"""
+        state = QuestionBankVersion.query.get(1)
+        if state is None:
+            state = QuestionBankVersion(id=1, version=0)
+            db.session.add(state)
+            db.session.commit()
+        with self._lock:
+            self._version = state.version
+        return state.version
+
+    def stored(self):
+        """读取数据库中的版本号（一次主键查询），尚未初始化时为 None"""
+        return db.session.execute(_STORED_VERSION).scalar()
+
+    def set(self, version):
+        with self._lock:
+            self._version = version
+
+    @property
+    def current(self):
+        if self._version is None:
+            return self.load()
+        return self._version
+
+    def bump(self):
+        """题库变更后递增版本号"""
+        if self._version is None:
+            self.load()
+        with self._lock:
+            QuestionBankVersion.query.filter_by(id=1).update({
+                QuestionBankVersion.version: QuestionBankVersion.version + 1
+            })
+            db.session.commit()
+            self._version = QuestionBankVersion.query.with_entities(QuestionBankVersion.version).filter_by(id=1).scalar()
+        return self._version
+
+bank_version = BankVersion()
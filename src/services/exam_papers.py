@@ -0,0 +1,198 @@
+"""考试试卷
+
+试卷按随机种子确定性地抽题。每场考试保存种子、抽题时的题库版本和抽到的题目ID列表，
+缓存未命中（淘汰、重启或由其他进程处理）时按保存的题目ID重建试卷，
+题库在考试期间增删题目也不会改变考生的试卷。试卷在进程内按考试ID缓存。
+
+集中开考时，后台线程预先生成一批试卷放入试卷池，开始考试时直接取用。
+"""
+import random
+import secrets
+import threading
+from collections import OrderedDict, deque
+from flask import current_app
+from src.services.bank_version import bank_version
+from src.services.question_index import EXAM_BLUEPRINT, draw_question_ids
+from src.services.question_fragments import build_questions_json
+
+PAPER_CACHE_SIZE = 4096
+
+def new_paper_seed():
+    """生成试卷随机种子（31位，可存入 Integer 字段）"""
+    return secrets.randbits(31)
+
+def generate_paper(seed, blueprint=EXAM_BLUEPRINT):
+    """按种子抽取试卷题目ID；题库版本相同时结果完全一致"""
+    return draw_question_ids(random.Random(seed), blueprint)
+
+class Paper:
+    """一份已生成的试卷：种子、题库版本、题目ID列表及编码好的题目JSON字节串"""
+    __slots__ = ('seed', 'bank_version', 'question_ids', 'questions_json')
+
+    def __init__(self, seed, version, question_ids, questions_json):
+        self.seed = seed
+        self.bank_version = version
+        self.question_ids = question_ids
+        self.questions_json = questions_json
+
+def build_paper(seed, blueprint=EXAM_BLUEPRINT):
+    """按种子生成试卷并序列化题目"""
+    version = bank_version.current
+    question_ids, questions_json = build_questions_json(generate_paper(seed, blueprint))
+    return Paper(seed, version, question_ids, questions_json)
+
+def encode_question_ids(question_ids):
+    """把试卷题目ID列表编码为保存在考试记录中的字符串"""
+    return ','.join(str(question_id) for question_id in question_ids)
+
+def decode_question_ids(value):
+    return [int(question_id) for question_id in value.split(',')] if value else []
+
+class PaperCache:
+    """按考试ID缓存已生成的试卷（LRU）"""
+
+    def __init__(self, max_size=PAPER_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._papers = OrderedDict()
+        self.max_size = max_size
+
+    def get(self, exam_id, seed):
+        with self._lock:
+            paper = self._papers.get(exam_id)
+            if paper is None or paper.seed != seed:
+                return None
+            self._papers.move_to_end(exam_id)
+            return paper
+
+    def put(self, exam_id, paper):
+        with self._lock:
+            self._papers[exam_id] = paper
+            self._papers.move_to_end(exam_id)
+            while len(self._papers) > self.max_size:
+                self._papers.popitem(last=False)
+
+    def discard(self, exam_id):
+        with self._lock:
+            self._papers.pop(exam_id, None)
+
+paper_cache = PaperCache()
+
+class PaperPool:
+    """预生成试卷池
+
+    后台线程把试卷池补满到 size 份；池中剩余少于 refill_threshold 份时唤醒补充。
+    题库变更后池中试卷作废并重新生成。
+    """
+
+    def __init__(self, blueprint=EXAM_BLUEPRINT, size=200, refill_threshold=50):
+        self.blueprint = blueprint
+        self.size = size
+        self.refill_threshold = refill_threshold
+        self._papers = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """读取配置并启动后台补充线程"""
+        self.size = app.config.get('EXAM_PAPER_POOL_SIZE', self.size)
+        self.refill_threshold = app.config.get('EXAM_PAPER_POOL_REFILL_THRESHOLD', self.refill_threshold)
+        if self.size <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(app,), name='exam-paper-pool', daemon=True)
+        self._thread.start()
+
+    def pop(self):
+        """取出一份当前题库版本的试卷，池为空时返回 None"""
+        with self._cond:
+            while self._papers and self._papers[0].bank_version != bank_version.current:
+                self._papers.popleft()
+            if self._papers:
+                paper = self._papers.popleft()
+                self.hits += 1
+            else:
+                paper = None
+                self.misses += 1
+            if len(self._papers) < self.refill_threshold:
+                self._cond.notify()
+            return paper
+
+    def invalidate(self):
+        """题库变更后清空试卷池"""
+        with self._cond:
+            self._papers.clear()
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            requests = self.hits + self.misses
+            return {
+                'size': self.size,
+                'refill_threshold': self.refill_threshold,
+                'available': len(self._papers),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0
+            }
+
+    def _run(self, app):
+        while True:
+            with self._cond:
+                while len(self._papers) >= self.refill_threshold:
+                    self._cond.wait()
+            try:
+                with app.app_context():
+                    self._fill()
+            except Exception:
+                app.logger.exception('试卷池补充失败')
+                with self._cond:
+                    self._cond.wait(timeout=5)
+
+    def _fill(self):
+        while True:
+            with self._cond:
+                if len(self._papers) >= self.size:
+                    return
+            paper = build_paper(new_paper_seed(), self.blueprint)
+            if not paper.question_ids:
+                # 题库为空时等待题库变更后再生成
+                with self._cond:
+                    self._cond.wait()
+                return
+            with self._cond:
+                if paper.bank_version == bank_version.current:
+                    self._papers.append(paper)
+
+paper_pool = PaperPool()
+
+def take_paper():
+    """开始考试时取一份试卷，试卷池未命中时当场生成"""
+    paper = paper_pool.pop()
+    if paper is None:
+        paper = build_paper(new_paper_seed())
+    return paper
+
+def get_exam_paper(exam):
+    """获取考试的试卷，优先使用缓存，缓存未命中时按保存的题目ID重建"""
+    paper = paper_cache.get(exam.id, exam.paper_seed)
+    if paper is not None:
+        return paper
+    
+    if exam.paper_question_ids is None:
+        # 旧考试记录没有保存题目ID：按种子抽题后保存，此后试卷不再变化
+        if exam.paper_seed is None:
+            exam.paper_seed = new_paper_seed()
+            exam.bank_version = bank_version.current
+        elif exam.bank_version != bank_version.current:
+            current_app.logger.warning(
+                '考试 %s 未保存题目ID且题库版本已从 %s 变为 %s，按当前题库重建试卷',
+                exam.id, exam.bank_version, bank_version.current
+            )
+        exam.paper_question_ids = encode_question_ids(generate_paper(exam.paper_seed))
+    
+    # 考试期间被删除的题目不再下发
+    question_ids, questions_json = build_questions_json(decode_question_ids(exam.paper_question_ids))
+    paper = Paper(exam.paper_seed, exam.bank_version, question_ids, questions_json)
+    paper_cache.put(exam.id, paper)
+    return paper
@@ -0,0 +1,636 @@
+"""Excel题库流式导入
+
+上传文件先落盘到临时文件，再用 openpyxl 只读模式逐行读取（iter_rows(values_only=True)），
+工作簿只解析一次，内存占用与工作簿大小无关。
+
+工作表较多时，各工作表在进程池中并行解析（每个进程只读模式打开工作簿并读取分到的工作表），
+解析结果按批通过队列流回唯一的写入方。openpyxl 只读模式无法跳转到指定行，
+按行区间拆分同一工作表需要重复解析前面的 XML，因此并行的粒度是工作表。
+
+解析出的题目按块写入：每块用题干内容哈希做一次 IN 查询去重（同一块内的重复题目也会被跳过），
+再以 Core executemany 批量插入并单独提交。更新模式下已存在的题目比较选项和答案，
+只对有变化的题目批量更新。某一块出错只回滚该块，之前已提交的块不受影响。
+"""
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import bindparam, insert
+from src.models.user import db
+from src.models.question import Question
+from src.services import bank_events
+from src.services.near_duplicates import NearDuplicateIndex, minhash_signature, minhash_signatures, near_duplicates
+
+# 解析结果回传给写入方的批大小
+PARSE_BATCH_SIZE = 1000
+
+# 寻找题目开始行时最多检查的行数
+START_ROW_SCAN_LIMIT = 50
+START_ROW_KEYWORDS = ['题目', '试题', '第1题', '1.', '1、']
+
+def clean_text(text):
+    """清理文本内容"""
+    if pd.isna(text) or text is None:
+        return ""
+    text = str(text).strip()
+    # 去除多余的空白字符
+    text = re.sub(r'\s+', ' ', text)
+    return text
+
+# 判断题关键词
+JUDGE_KEYWORDS = ['判断', '对错', '正确', '错误', '是否', '√', '×', 'true', 'false', '（判断）', '(判断)']
+# 多选题关键词
+MULTIPLE_KEYWORDS = ['多选', '选择', '（多选）', '(多选)', '以下哪些', '包括哪些']
+
+# 整列解析用：一列文本以 NUL 拼接后整体做正则扫描（Excel 单元格中不会出现 NUL 字符）。
+# 关键词合并为一个正则，匹配结果与逐个关键词做子串判断相同
+COLUMN_SEPARATOR = '\x00'
+WHITESPACE_PATTERN = re.compile(r'\s+')
+JUDGE_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in JUDGE_KEYWORDS))
+MULTIPLE_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in MULTIPLE_KEYWORDS))
+ANSWER_MULTIPLE_PATTERN = re.compile('[,，]')
+ANSWER_RIGHT_PATTERN = re.compile('正确|对|√')
+ANSWER_WRONG_PATTERN = re.compile('错|×')
+
+def detect_question_type(question_text):
+    """根据题目内容检测题型"""
+    question_text = question_text.lower()
+    
+    if any(keyword in question_text for keyword in JUDGE_KEYWORDS):
+        return 'judge'
+    
+    if any(keyword in question_text for keyword in MULTIPLE_KEYWORDS):
+        return 'multiple'
+    
+    # 默认为单选题
+    return 'single'
+
+def parse_options(row, start_col=1, end_col=5):
+    """解析选项"""
+    options = {}
+    option_labels = ['A', 'B', 'C', 'D', 'E', 'F']
+    
+    for i, label in enumerate(option_labels[:end_col-start_col]):
+        col_index = start_col + i
+        if col_index < len(row):
+            option_text = clean_text(row[col_index])
+            if option_text:
+                options[f'option_{label.lower()}'] = option_text
+    
+    return options
+
+def parse_correct_answer(answer_text):
+    """解析正确答案"""
+    if pd.isna(answer_text) or answer_text is None:
+        return 'A'
+    
+    answer_text = str(answer_text).strip().upper()
+    
+    # 处理多种答案格式
+    if ',' in answer_text or '，' in answer_text:
+        # 多选题答案
+        return answer_text.replace('，', ',')
+    elif len(answer_text) == 1 and answer_text in 'ABCDEF':
+        return answer_text
+    elif '正确' in answer_text or '对' in answer_text or '√' in answer_text:
+        return '正确'
+    elif '错误' in answer_text or '错' in answer_text or '×' in answer_text:
+        return '错误'
+    else:
+        return answer_text
+
+def parse_row(row):
+    """把一行解析为题目字段，第一列不是题目时返回 None"""
+    # 检查第一列是否有内容（题目）
+    question_text = clean_text(row[0]) if row else ''
+    if not question_text or len(question_text) < 10:
+        return None
+    
+    # 检测题型
+    question_type = detect_question_type(question_text)
+    
+    # 解析选项
+    options = parse_options(row)
+    
+    # 解析答案（通常在最后几列）
+    correct_answer = 'A'
+    for col_index in range(len(row)-1, max(4, len(row)-5), -1):
+        if row[col_index] is not None:
+            potential_answer = clean_text(row[col_index])
+            if potential_answer and len(potential_answer) <= 10:
+                correct_answer = parse_correct_answer(potential_answer)
+                break
+    
+    return {
+        'question_text': question_text,
+        'question_type': question_type,
+        'option_a': options.get('option_a'),
+        'option_b': options.get('option_b'),
+        'option_c': options.get('option_c'),
+        'option_d': options.get('option_d'),
+        'correct_answer': correct_answer,
+        'difficulty': 1
+    }
+
+def _cell_text(value):
+    """单元格转为字符串，空值为空串（与 clean_text 的判断一致）"""
+    if value is None or pd.isna(value):
+        return ''
+    return str(value)
+
+def _join_column(texts):
+    """把一列文本拼成一个字符串，文本中含有分隔符时返回 None"""
+    joined = COLUMN_SEPARATOR.join(texts)
+    if joined.count(COLUMN_SEPARATOR) != len(texts) - 1:
+        return None
+    return joined
+
+def _rows_matching(pattern, joined, pieces):
+    """在拼接后的整列上做一次正则扫描，返回各行是否匹配"""
+    starts = np.cumsum([0] + [len(piece) + 1 for piece in pieces[:-1]])
+    hits = [match.start() for match in pattern.finditer(joined)]
+    matched = np.zeros(len(pieces), dtype=bool)
+    if hits:
+        matched[np.searchsorted(starts, hits, side='right') - 1] = True
+    return matched
+
+def clean_column(values):
+    """clean_text 的整列版本，返回字符串对象数组"""
+    texts = [value if value.__class__ is str else _cell_text(value) for value in values]
+    joined = _join_column(texts)
+    if joined is None:
+        return np.array([clean_text(value) for value in values], dtype=object)
+    # 先合并空白再去首尾空白，与先去首尾空白再合并的结果相同
+    return np.array([piece.strip() for piece in WHITESPACE_PATTERN.sub(' ', joined).split(COLUMN_SEPARATOR)], dtype=object)
+
+def detect_question_types(question_texts):
+    """detect_question_type 的整列版本"""
+    joined = _join_column(list(question_texts))
+    if joined is None:
+        return np.array([detect_question_type(text) for text in question_texts], dtype=object)
+    
+    lowered = joined.lower()
+    pieces = lowered.split(COLUMN_SEPARATOR)
+    judge = _rows_matching(JUDGE_PATTERN, lowered, pieces)
+    multiple = _rows_matching(MULTIPLE_PATTERN, lowered, pieces)
+    return np.where(judge, 'judge', np.where(multiple, 'multiple', 'single')).astype(object)
+
+def parse_correct_answers(answer_texts):
+    """parse_correct_answer 的整列版本（输入为已清理的非空字符串）"""
+    joined = _join_column(list(answer_texts))
+    if joined is None:
+        return np.array([parse_correct_answer(text) for text in answer_texts], dtype=object)
+    
+    upper = joined.upper()
+    pieces = upper.split(COLUMN_SEPARATOR)
+    answers = np.array([piece.strip() for piece in pieces], dtype=object)
+    multiple = _rows_matching(ANSWER_MULTIPLE_PATTERN, upper, pieces)
+    letter = np.array([len(answer) == 1 and answer in 'ABCDEF' for answer in answers], dtype=bool)
+    right = _rows_matching(ANSWER_RIGHT_PATTERN, upper, pieces)
+    wrong = _rows_matching(ANSWER_WRONG_PATTERN, upper, pieces)
+    
+    # 按优先级从低到高覆盖，与逐行判断的先后顺序一致
+    result = answers.copy()
+    result[wrong] = '错误'
+    result[right] = '正确'
+    result[letter] = answers[letter]
+    result[multiple] = np.array([answer.replace('，', ',') for answer in answers[multiple]], dtype=object)
+    return result
+
+def parse_rows(rows):
+    """parse_row 的整列版本：一次解析多行，结果与逐行调用 parse_row 完全相同
+
+    各行长度可以不同，答案列按每行自身的长度从行尾向前查找。
+    """
+    results = [None] * len(rows)
+    
+    # 第一列不足10个字符的行不是题目，其余各列只处理题目行
+    question_texts = clean_column([row[0] if row else None for row in rows])
+    valid = np.flatnonzero(np.fromiter(map(len, question_texts), dtype=np.int64, count=len(rows)) >= 10)
+    if len(valid) == 0:
+        return results
+    
+    rows = [rows[i] for i in valid]
+    question_texts = question_texts[valid]
+    question_types = detect_question_types(question_texts)
+    
+    # 选项：第2至5列，空白选项为 None
+    options = []
+    for col_index in range(1, 5):
+        column = clean_column([row[col_index] if col_index < len(row) else None for row in rows])
+        column[column == ''] = None
+        options.append(column)
+    
+    # 答案：从行尾向前最多查找4列（不早于第6列），取第一个清理后长度为1-10的单元格
+    lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+    correct_answers = np.full(len(rows), 'A', dtype=object)
+    answer_texts = np.full(len(rows), None, dtype=object)
+    found = np.zeros(len(rows), dtype=bool)
+    pending = np.flatnonzero(lengths >= 6)
+    for offset in range(4):
+        pending = pending[lengths[pending] - 1 - offset >= 5]
+        if len(pending) == 0:
+            break
+        texts = clean_column([rows[i][lengths[i] - 1 - offset] for i in pending])
+        usable = np.fromiter(((1 <= len(text) <= 10) for text in texts), dtype=bool, count=len(pending))
+        answer_texts[pending[usable]] = texts[usable]
+        found[pending[usable]] = True
+        pending = pending[~usable]
+    
+    if found.any():
+        correct_answers[found] = parse_correct_answers(answer_texts[found])
+    
+    columns = zip(question_texts, question_types, *options, correct_answers)
+    for i, (question_text, question_type, option_a, option_b, option_c, option_d, correct_answer) in zip(valid.tolist(), columns):
+        results[i] = {
+            'question_text': question_text,
+            'question_type': question_type,
+            'option_a': option_a,
+            'option_b': option_b,
+            'option_c': option_c,
+            'option_d': option_d,
+            'correct_answer': correct_answer,
+            'difficulty': 1
+        }
+    return results
+
+def is_start_row(row):
+    """检查是否包含题目标识"""
+    row_text = ' '.join(str(cell) for cell in row if cell is not None)
+    return any(keyword in row_text for keyword in START_ROW_KEYWORDS)
+
+def iter_question_rows(rows):
+    """从工作表的行迭代器中找到题目开始行，并逐行产出 (行号, 行)
+
+    只缓冲开头的若干行用于寻找开始行，其余各行流式读取。
+    """
+    head = []
+    start_row = 0
+    for i, row in enumerate(rows):
+        head.append(row)
+        if is_start_row(row):
+            start_row = i
+            break
+        if i >= START_ROW_SCAN_LIMIT:
+            break
+    
+    for i, row in enumerate(head):
+        if i >= start_row:
+            yield i, row
+    for i, row in enumerate(rows, start=len(head)):
+        yield i, row
+
+def spool_upload(file):
+    """把上传文件写入临时文件，返回文件路径"""
+    fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='import_')
+    with os.fdopen(fd, 'wb') as f:
+        file.save(f)
+    return path
+
+def iter_sheets(path):
+    """只读模式打开工作簿，逐个产出 (工作表名, 行迭代器)"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            yield worksheet.title, worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def parse_block(rows):
+    """整列解析一组行，返回 (题目字段列表, 出错行数)
+
+    题目字段中已计算好 content_hash 和 minhash。整列解析出错时改为逐行解析，出错的行计入错误数。
+    """
+    try:
+        parsed = parse_rows(rows)
+        error_count = 0
+    except Exception as e:
+        parsed = []
+        error_count = 0
+        for row in rows:
+            try:
+                parsed.append(parse_row(row))
+            except Exception as e:
+                error_count += 1
+                continue
+    
+    batch = [fields for fields in parsed if fields is not None]
+    signatures = minhash_signatures([fields['question_text'] for fields in batch])
+    for fields, signature in zip(batch, signatures):
+        fields['content_hash'] = Question.compute_content_hash(fields['question_text'])
+        fields['minhash'] = signature
+    return batch, error_count
+
+def parse_sheet(rows, batch_size=PARSE_BATCH_SIZE):
+    """解析一个工作表的行，每 batch_size 行产出一次 (题目字段列表, 出错行数)
+
+    解析和哈希都在调用方所在的进程完成。
+    """
+    block = []
+    # 从找到的起始行开始逐行处理
+    for index, row in iter_question_rows(rows):
+        block.append(row)
+        if len(block) >= batch_size:
+            yield parse_block(block)
+            block = []
+    
+    if block:
+        batch, error_count = parse_block(block)
+        if batch or error_count:
+            yield batch, error_count
+
+# 解析进程中的结果队列和停止标志，由进程池初始化时传入
+_result_queue = None
+_stop_event = None
+
+def _init_parse_worker(result_queue, stop_event):
+    global _result_queue, _stop_event
+    _result_queue = result_queue
+    _stop_event = stop_event
+
+def _rows_until_stopped(rows, check_every=100):
+    """停止标志置位后不再读取后续行"""
+    for i, row in enumerate(rows):
+        if i % check_every == 0 and _stop_event.is_set():
+            return
+        yield row
+
+def _parse_sheet_task(path, sheet_index, batch_size):
+    """解析进程：读取一个工作表，结果按批放入队列，最后放入结束标记
+
+    结束标记为 (工作表序号, 工作表名, None, 错误信息)，解析出错时错误信息不为空。
+    """
+    sheet_name = None
+    error = None
+    try:
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            worksheet = workbook.worksheets[sheet_index]
+            sheet_name = worksheet.title
+            rows = _rows_until_stopped(worksheet.iter_rows(values_only=True))
+            for batch, error_count in parse_sheet(rows, batch_size):
+                if _stop_event.is_set():
+                    return
+                _result_queue.put((sheet_index, sheet_name, batch, error_count))
+        finally:
+            workbook.close()
+    except Exception as e:
+        # 异常对象不一定能序列化，只回传错误信息
+        error = f'{type(e).__name__}: {e}'
+    finally:
+        _result_queue.put((sheet_index, sheet_name, None, error))
+
+class SheetParseError(Exception):
+    """整个工作表解析失败"""
+
+def parse_context():
+    """解析进程的启动方式
+
+    服务进程中有多个后台线程（作答暂存、判分、试卷池、导入线程池）持有锁，
+    fork 出的子进程可能继承被锁住的锁而死锁，因此用 forkserver（Windows 等平台用 spawn）：
+    子进程由单线程的 forkserver 进程创建，forkserver 预先导入解析模块。
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(['__main__', __name__])
+    return context
+
+def sheet_count(path):
+    """工作簿中的工作表数量"""
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return len(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+def iter_parsed_batches(path, processes=1, batch_size=PARSE_BATCH_SIZE):
+    """解析整个工作簿，按批产出 (工作表名, 题目字段列表, 出错行数)
+
+    processes 大于 1 且有多个工作表时，各工作表在进程池中并行解析，
+    不同工作表的批次按完成先后交错产出。提前关闭生成器会停止所有解析进程。
+    单行出错计入出错行数；整个工作表解析出错（文件损坏或解析程序错误）时抛出 SheetParseError。
+    """
+    count = sheet_count(path) if processes > 1 else 1
+    if processes <= 1 or count <= 1:
+        for sheet_name, rows in iter_sheets(path):
+            try:
+                for batch, error_count in parse_sheet(rows, batch_size):
+                    yield sheet_name, batch, error_count
+            except Exception as e:
+                raise SheetParseError(f'工作表 {sheet_name} 解析失败: {type(e).__name__}: {e}') from e
+        return
+    
+    context = parse_context()
+    result_queue = context.Queue(maxsize=processes * 4)
+    stop_event = context.Event()
+    executor = ProcessPoolExecutor(
+        max_workers=min(processes, count),
+        mp_context=context,
+        initializer=_init_parse_worker,
+        initargs=(result_queue, stop_event)
+    )
+    futures = [executor.submit(_parse_sheet_task, path, i, batch_size) for i in range(count)]
+    try:
+        remaining = count
+        while remaining:
+            try:
+                # 普通批次最后一项是出错行数，结束标记的最后一项是错误信息
+                sheet_index, sheet_name, batch, detail = result_queue.get(timeout=1)
+            except Empty:
+                # 解析进程异常退出时不会放入结束标记
+                for future in futures:
+                    if future.done() and not future.cancelled() and future.exception():
+                        raise future.exception()
+                continue
+            
+            if batch is None:
+                if detail is not None:
+                    raise SheetParseError(f'工作表 {sheet_name or sheet_index + 1} 解析失败: {detail}')
+                remaining -= 1
+                continue
+            yield sheet_name, batch, detail
+    finally:
+        stop_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        # 取走队列中剩余的结果，避免解析进程阻塞在 put 上
+        while not all(future.done() for future in futures):
+            try:
+                result_queue.get(timeout=0.1)
+            except Empty:
+                pass
+        executor.shutdown(wait=True)
+
+IMPORT_MODES = ('skip', 'upsert')
+# 更新模式下比较并更新的字段
+DIFF_FIELDS = ['option_a', 'option_b', 'option_c', 'option_d', 'correct_answer']
+# 导入结果中最多列出的变更题目数
+MAX_REPORTED_CHANGES = 100
+
+class QuestionImporter:
+    """把解析好的题目分块去重、批量写入，每块提交一次
+
+    mode='skip'    已存在的题目（题干内容哈希相同）跳过
+    mode='upsert'  已存在的题目比较选项和答案，只更新有变化的题目（修订号加1）
+    dry_run=True   只统计新增、变更、未变化的题目，不写入数据库
+    skip_near_duplicates=True  新题目与题库中或本次上传中已有题目近似重复时跳过
+    """
+
+    def __init__(self, chunk_size=1000, mode='skip', dry_run=False, skip_near_duplicates=False):
+        self.chunk_size = chunk_size
+        self.mode = mode
+        self.dry_run = dry_run
+        self.skip_near_duplicates = skip_near_duplicates
+        self.parsed_count = 0
+        self.imported_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+        self.duplicate_count = 0
+        self.near_duplicate_count = 0
+        self.error_count = 0
+        self.sheet_counts = {}
+        self.chunks = []
+        self.changes = []
+        self._batch = []
+        # 不写入数据库或需要区分文件内重复时，记录本次上传中已出现的题目
+        self._seen = set() if mode == 'upsert' or dry_run else None
+        # 本次上传中已接受的新题目，题库索引要到导入结束后才重建
+        self._near_seen = NearDuplicateIndex() if skip_near_duplicates else None
+
+    def add(self, sheet_name, fields):
+        """加入一道解析好的题目，攒满一块即写入"""
+        if 'content_hash' not in fields:
+            fields['content_hash'] = Question.compute_content_hash(fields['question_text'])
+        if 'minhash' not in fields:
+            fields['minhash'] = minhash_signature(fields['question_text'])
+        self.parsed_count += 1
+        self._batch.append((sheet_name, fields))
+        if len(self._batch) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """对当前块去重、比较后批量写入并提交，返回该块的进度记录"""
+        if not self._batch:
+            return None
+        
+        batch, self._batch = self._batch, []
+        chunk = {
+            'chunk': len(self.chunks) + 1,
+            'rows': len(batch),
+            'imported': 0,
+            'duplicates': 0
+        }
+        if self.mode == 'upsert':
+            chunk['updated'] = 0
+            chunk['unchanged'] = 0
+        if self.skip_near_duplicates:
+            chunk['near_duplicates'] = 0
+        self.chunks.append(chunk)
+        
+        try:
+            rows, updates, changes, sheet_counts, counts = self._diff(batch)
+            
+            if not self.dry_run:
+                if rows:
+                    db.session.execute(insert(Question), rows)
+                if updates:
+                    table = Question.__table__
+                    values = {field: bindparam(f'b_{field}') for field in DIFF_FIELDS}
+                    db.session.execute(
+                        table.update().where(table.c.id == bindparam('b_id')).values(
+                            revision=table.c.revision + 1, **values
+                        ),
+                        updates
+                    )
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            chunk['error'] = str(e)
+            self.error_count += len(batch)
+            return chunk
+        
+        chunk.update(counts)
+        self.imported_count += counts['imported']
+        self.duplicate_count += counts['duplicates']
+        self.updated_count += counts.get('updated', 0)
+        self.unchanged_count += counts.get('unchanged', 0)
+        self.near_duplicate_count += counts.get('near_duplicates', 0)
+        self.changes.extend(changes[:MAX_REPORTED_CHANGES - len(self.changes)])
+        for sheet_name, count in sheet_counts.items():
+            self.sheet_counts[sheet_name] = self.sheet_counts.get(sheet_name, 0) + count
+        # 已提交的分块立即生效，判分和缓存不能等到整个导入结束
+        if not self.dry_run and (rows or updates):
+            bank_events.chunk_imported([update['b_id'] for update in updates], inserted=bool(rows))
+        return chunk
+
+    def _diff(self, batch):
+        """把一块题目分为新增、变更、未变化和重复"""
+        hashes = {fields['content_hash'] for _, fields in batch}
+        if self.mode == 'upsert':
+            existing = {
+                row.content_hash: row for row in
+                db.session.query(Question.id, Question.content_hash, *[getattr(Question, field) for field in DIFF_FIELDS])
+                .filter(Question.content_hash.in_(hashes))
+            }
+        else:
+            existing = {
+                content_hash: None for (content_hash,) in
+                db.session.query(Question.content_hash).filter(Question.content_hash.in_(hashes))
+            }
+        
+        seen = self._seen if self._seen is not None else set()
+        rows = []
+        updates = []
+        changes = []
+        sheet_counts = {}
+        counts = {'imported': 0, 'duplicates': 0}
+        if self.mode == 'upsert':
+            counts.update(updated=0, unchanged=0)
+        if self.skip_near_duplicates:
+            counts['near_duplicates'] = 0
+            near_duplicates.ensure_built()
+        
+        for sheet_name, fields in batch:
+            content_hash = fields['content_hash']
+            if content_hash in seen:
+                counts['duplicates'] += 1
+                continue
+            seen.add(content_hash)
+            
+            if content_hash not in existing:
+                if self._near_seen is not None:
+                    signature = fields['minhash']
+                    if near_duplicates.find(signature) or self._near_seen.find(signature):
+                        counts['near_duplicates'] += 1
+                        continue
+                    self._near_seen.add(len(self._near_seen), signature)
+                rows.append(fields)
+                counts['imported'] += 1
+            elif self.mode == 'upsert':
+                current = existing[content_hash]
+                changed = {
+                    field: {'old': getattr(current, field), 'new': fields[field]}
+                    for field in DIFF_FIELDS if getattr(current, field) != fields[field]
+                }
+                if not changed:
+                    counts['unchanged'] += 1
+                    continue
+                update = {f'b_{field}': fields[field] for field in DIFF_FIELDS}
+                update['b_id'] = current.id
+                updates.append(update)
+                changes.append({'id': current.id, 'question_text': fields['question_text'][:50], 'changes': changed})
+                counts['updated'] += 1
+            else:
+                counts['duplicates'] += 1
+                continue
+            sheet_counts[sheet_name] = sheet_counts.get(sheet_name, 0) + 1
+        
+        return rows, updates, changes, sheet_counts, counts
+
+    def sheets_processed(self):
+        return [f"{sheet_name}: {count}题" for sheet_name, count in self.sheet_counts.items()]
@@ -0,0 +1,130 @@
+"""考试判分
+
+考生作答已通过暂存接口写入 AnswerRecord，交卷时整份答卷按批处理：
+答案键取自编译缓存，判分为一次向量化比较，批量更新答题记录，
+错题本用一条 INSERT ... ON CONFLICT DO UPDATE 语句批量更新。
+"""
+from datetime import datetime
+from sqlalchemy import bindparam, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.models.user import db
+from src.models.exam import AnswerRecord, WrongQuestion
+from src.services.answer_keys import UNCOMPILED, answer_keys, encode_submitted, grade_masks
+
+# 答错时难易系数的降幅及下限（SM-2）
+LAPSE_EASE_PENALTY = 0.2
+LAPSE_MIN_EASE = 1.3
+
+def is_answer_correct(question_type, correct_answer, user_answer):
+    """判断单道题是否作答正确"""
+    if question_type == 'multiple':
+        # 多选题需要完全匹配
+        correct_answers = set(correct_answer.split(','))
+        user_answers = set(user_answer.split(',')) if user_answer else set()
+        return correct_answers == user_answers
+    # 单选题和判断题
+    return user_answer == correct_answer
+
+def check_answers(question_ids, user_answers):
+    """批量判断作答是否正确
+
+    返回与输入等长的列表，题库中不存在的题目对应 None。
+    答案键取自编译缓存，整批作答用一次向量化比较完成判分。
+    """
+    keys = answer_keys.get_many(set(question_ids))
+    graded = [
+        (i, keys[question_id], user_answer)
+        for i, (question_id, user_answer) in enumerate(zip(question_ids, user_answers))
+        if question_id in keys
+    ]
+    
+    key_masks = [key[2] for _, key, _ in graded]
+    submitted_masks = [encode_submitted(key[0], user_answer) for _, key, user_answer in graded]
+    matches = grade_masks(key_masks, submitted_masks).tolist()
+    
+    results = [None] * len(question_ids)
+    for (i, key, user_answer), is_correct in zip(graded, matches):
+        question_type, correct_answer, key_mask = key
+        if key_mask == UNCOMPILED:
+            # 答案键无法编码时按原规则逐题比较
+            is_correct = is_answer_correct(question_type, correct_answer, user_answer)
+        results[i] = is_correct
+    return results
+
+def grade_exam(user_id, exam_id):
+    """对已保存的答题记录批量判分，并更新错题本（不提交事务）
+
+    返回 (答对的题目数, 参与判分的题目数)。题库中已不存在的题目不参与判分。
+    """
+    records = db.session.query(
+        AnswerRecord.id,
+        AnswerRecord.question_id,
+        AnswerRecord.user_answer
+    ).filter(AnswerRecord.exam_id == exam_id).all()
+    results = check_answers(
+        [record.question_id for record in records],
+        [record.user_answer for record in records]
+    )
+    
+    now = datetime.utcnow()
+    correct_ids = []
+    wrong_rows = []
+    
+    for (record_id, question_id, _), is_correct in zip(records, results):
+        if is_correct is None:
+            continue
+        if is_correct:
+            correct_ids.append({'b_id': record_id})
+        else:
+            wrong_rows.append({
+                'user_id': user_id,
+                'question_id': question_id,
+                'wrong_count': 1,
+                'last_wrong_time': now,
+                'is_mastered': False,
+                'due_at': now
+            })
+    
+    # 答题记录保存时默认为错误，只需更新答对的记录
+    if correct_ids:
+        answer_table = AnswerRecord.__table__
+        db.session.execute(
+            answer_table.update().where(answer_table.c.id == bindparam('b_id')).values(is_correct=True),
+            correct_ids
+        )
+    
+    if wrong_rows:
+        wrong_table = WrongQuestion.__table__
+        stmt = sqlite_insert(wrong_table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[wrong_table.c.user_id, wrong_table.c.question_id],
+            set_={
+                'wrong_count': wrong_table.c.wrong_count + 1,
+                'last_wrong_time': stmt.excluded.last_wrong_time,
+                'is_mastered': False,
+                # 再次答错时复习计划重新开始
+                'due_at': stmt.excluded.due_at,
+                'interval_days': 0,
+                'review_count': 0,
+                'ease': func.max(LAPSE_MIN_EASE, wrong_table.c.ease - LAPSE_EASE_PENALTY)
+            }
+        )
+        db.session.execute(stmt, wrong_rows)
+    
+    return len(correct_ids), sum(1 for is_correct in results if is_correct is not None)
+
+def finalize_exam(exam):
+    """判分并把考试记录更新为已完成（不提交事务），返回得分"""
+    correct_count, graded_count = grade_exam(exam.user_id, exam.id)
+    
+    # 计算分数（未作答的题目按错误计）
+    total_questions = exam.total_questions or graded_count
+    score = (correct_count / total_questions) * 100 if total_questions > 0 else 0
+    
+    # 更新考试记录
+    exam.end_time = exam.end_time or datetime.utcnow()
+    exam.total_questions = total_questions
+    exam.correct_count = correct_count
+    exam.score = score
+    exam.status = 'completed'
+    return score
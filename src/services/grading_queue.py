@@ -0,0 +1,223 @@
+"""异步判分队列
+
+交卷时可以只保存答案并返回 202，由后台线程池完成判分。
+队列以文件形式保存在本地磁盘上，进程重启后未完成的任务会重新执行：
+
+    pending/     待处理的任务，每个任务一个 JSON 文件，文件名以可执行时间开头，按时间排序
+    processing/  已被工作线程领取、尚未完成的任务
+
+同一任务可能被执行多次（多个进程共用队列目录、重启时领取中的任务放回待处理等），
+判分时用 UPDATE ... WHERE status = 'grading' 认领考试，只有一次执行会真正判分。
+考试已标记为判分中但没有对应任务时（提交任务前进程崩溃或写入队列失败），
+启动时及之后定期重新提交。
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from src.models.user import db
+from src.models.exam import ExamRecord
+from src.services import bank_events
+from src.services.grading import finalize_exam
+
+# 判分失败后第 n 次重试前等待 RETRY_DELAY * 2^(n-1) 秒
+RETRY_DELAY = 5
+# 检查遗漏判分任务的间隔（秒），只重新提交交卷时间早于该间隔的考试
+RECOVER_INTERVAL = 60
+
+class FileQueue:
+    """基于本地目录的持久化队列"""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    @property
+    def pending_dir(self):
+        return os.path.join(self.directory, 'pending')
+
+    @property
+    def processing_dir(self):
+        return os.path.join(self.directory, 'processing')
+
+    def open(self, directory=None):
+        """创建队列目录，并把上次未完成的任务放回待处理"""
+        if directory:
+            self.directory = directory
+        os.makedirs(self.pending_dir, exist_ok=True)
+        os.makedirs(self.processing_dir, exist_ok=True)
+        for name in os.listdir(self.processing_dir):
+            os.replace(os.path.join(self.processing_dir, name), os.path.join(self.pending_dir, name))
+
+    def put(self, payload, delay=0):
+        """写入一个任务（delay 秒后才可领取），返回任务编号"""
+        ticket = f'{time.time_ns() + int(delay * 1e9):020d}-{uuid.uuid4().hex[:8]}'
+        path = os.path.join(self.pending_dir, ticket + '.json')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return ticket
+
+    def get(self):
+        """领取最早的已到期任务，返回 (任务编号, 内容)，没有到期任务时返回 None"""
+        now = time.time_ns()
+        with self._lock:
+            for name in sorted(os.listdir(self.pending_dir)):
+                if not name.endswith('.json'):
+                    continue
+                if int(name.split('-', 1)[0]) > now:
+                    break
+                processing_path = os.path.join(self.processing_dir, name)
+                try:
+                    os.replace(os.path.join(self.pending_dir, name), processing_path)
+                except FileNotFoundError:
+                    continue
+                with open(processing_path, encoding='utf-8') as f:
+                    return name[:-len('.json')], json.load(f)
+        return None
+
+    def ack(self, ticket):
+        """任务完成后删除"""
+        try:
+            os.remove(os.path.join(self.processing_dir, ticket + '.json'))
+        except FileNotFoundError:
+            pass
+
+    def retry(self, ticket, payload, delay=0):
+        """任务失败后以新的任务编号放回待处理，delay 秒后才可领取"""
+        self.put(payload, delay)
+        self.ack(ticket)
+
+    def size(self):
+        return len([name for name in os.listdir(self.pending_dir) if name.endswith('.json')])
+
+    def payloads(self):
+        """读取待处理和处理中的全部任务内容"""
+        payloads = []
+        for directory in (self.pending_dir, self.processing_dir):
+            for name in os.listdir(directory):
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(directory, name), encoding='utf-8') as f:
+                        payloads.append(json.load(f))
+                except (FileNotFoundError, ValueError):
+                    # 读取期间任务已完成或被移动
+                    continue
+        return payloads
+
+class GradingWorkers:
+    """后台判分线程池"""
+
+    def __init__(self, queue, workers=2, max_attempts=3):
+        self.queue = queue
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._wakeup = threading.Event()
+        self._recover_lock = threading.Lock()
+        self._last_recover = 0.0
+        self._threads = []
+
+    def init_app(self, app):
+        """打开队列目录，补交遗漏的判分任务并启动判分线程"""
+        self.workers = app.config.get('GRADING_WORKERS', self.workers)
+        self.queue.open(app.config.get('GRADING_QUEUE_DIR'))
+        with app.app_context():
+            self.recover()
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(app,), name=f'grading-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, exam_id):
+        """提交判分任务，返回任务编号"""
+        ticket = self.queue.put({'exam_id': exam_id, 'attempts': 0})
+        self._wakeup.set()
+        return ticket
+
+    def recover(self, min_age=RECOVER_INTERVAL):
+        """为判分中但队列里没有任务的考试重新提交任务，返回重新提交的考试ID
+
+        只处理交卷时间早于 min_age 秒的考试，避免与刚交卷、尚未写入队列的请求重复提交
+        （重复提交也只会判分一次）。
+        """
+        self._last_recover = time.monotonic()
+        queued = {payload.get('exam_id') for payload in self.queue.payloads()}
+        cutoff = datetime.utcnow() - timedelta(seconds=min_age)
+        exam_ids = [
+            exam_id for (exam_id,) in db.session.query(ExamRecord.id).filter(
+                ExamRecord.status == 'grading',
+                or_(ExamRecord.end_time.is_(None), ExamRecord.end_time < cutoff)
+            )
+            if exam_id not in queued
+        ]
+        for exam_id in exam_ids:
+            self.submit(exam_id)
+        return exam_ids
+
+    def _run(self, app):
+        while True:
+            try:
+                with app.app_context():
+                    if not self._work_once(app):
+                        self._maybe_recover()
+                        self._wakeup.wait(timeout=1)
+                        self._wakeup.clear()
+            except Exception:
+                # 队列目录读写失败等意外错误：记录后稍等再继续，不让线程退出
+                app.logger.exception('判分线程出错')
+                time.sleep(1)
+
+    def _work_once(self, app):
+        """领取并执行一个任务，没有到期任务时返回 False"""
+        job = self.queue.get()
+        if job is None:
+            return False
+        
+        ticket, payload = job
+        try:
+            self._grade(payload['exam_id'])
+            self.queue.ack(ticket)
+        except Exception:
+            db.session.rollback()
+            payload['attempts'] = payload.get('attempts', 0) + 1
+            app.logger.exception('考试 %s 判分失败（第 %s 次）', payload['exam_id'], payload['attempts'])
+            if payload['attempts'] < self.max_attempts:
+                self.queue.retry(ticket, payload, RETRY_DELAY * 2 ** (payload['attempts'] - 1))
+            else:
+                self._mark_failed(payload['exam_id'])
+                self.queue.ack(ticket)
+        return True
+
+    def _maybe_recover(self):
+        with self._recover_lock:
+            if time.monotonic() - self._last_recover < RECOVER_INTERVAL:
+                return
+            self.recover()
+
+    def _grade(self, exam_id):
+        # 答案键可能已被其他进程修改
+        bank_events.sync()
+        # 认领考试：任务被重复执行（重启或多个进程）时只有一次能把判分中的考试改为已完成
+        claimed = ExamRecord.query.filter_by(id=exam_id, status='grading').update(
+            {'status': 'completed'}, synchronize_session=False
+        )
+        if not claimed:
+            db.session.rollback()
+            return
+        finalize_exam(db.session.get(ExamRecord, exam_id))
+        db.session.commit()
+
+    def _mark_failed(self, exam_id):
+        ExamRecord.query.filter_by(id=exam_id, status='grading').update({'status': 'grading_failed'})
+        db.session.commit()
+
+grading_workers = GradingWorkers(FileQueue())
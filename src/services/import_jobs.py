@@ -0,0 +1,311 @@
+"""后台题库导入任务
+
+导入请求只负责把上传文件落盘并提交任务，解析和写入在进程内的线程池中完成，
+不依赖外部消息队列。任务状态和进度保存在 question_import_job 表中，
+多进程部署时任意进程都能查询和取消任务，只保留最近的若干个任务：
+
+    queued     已提交，等待线程池执行
+    running    正在解析、写入
+    completed  导入完成
+    cancelled  已取消（取消前已提交的分块保留）
+    failed     导入出错（出错前已提交的分块保留）
+
+执行任务的进程退出后（重启或崩溃），启动时把同一主机上这些进程留下的任务接管过来：
+排队中的任务重新执行，执行中的任务标记为失败，并删除落盘的上传文件。
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from src.models.user import db
+from src.models.question import QuestionImportJob
+from src.services import bank_events
+from src.services.excel_import import QuestionImporter, iter_parsed_batches
+
+FINISHED_STATUSES = ('completed', 'cancelled', 'failed')
+# 执行中的任务写入进度、检查取消请求的最小间隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+class ImportCancelled(Exception):
+    pass
+
+class ImportJob:
+    """本进程正在执行的一次导入任务及其进度"""
+
+    def __init__(self, path, filename, chunk_size, mode='skip', dry_run=False, skip_near_duplicates=False, job_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.path = path
+        self.filename = filename
+        self.importer = QuestionImporter(
+            chunk_size=chunk_size,
+            mode=mode,
+            dry_run=dry_run,
+            skip_near_duplicates=skip_near_duplicates
+        )
+        self.status = 'queued'
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.saved_at = 0.0
+        self._cancel = threading.Event()
+
+    @classmethod
+    def from_record(cls, record):
+        """按任务记录重新创建排队中的任务"""
+        state = json.loads(record.progress)
+        job = cls(
+            record.path,
+            state['filename'],
+            state['chunk_size'],
+            state['mode'],
+            state['dry_run'],
+            state['skip_near_duplicates'],
+            job_id=record.id
+        )
+        job.created_at = record.created_at
+        return job
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def to_dict(self):
+        importer = self.importer
+        return {
+            'job_id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'mode': importer.mode,
+            'dry_run': importer.dry_run,
+            'skip_near_duplicates': importer.skip_near_duplicates,
+            'cancel_requested': self.cancel_requested,
+            'rows_parsed': importer.parsed_count + importer.error_count,
+            'inserted': importer.imported_count,
+            'updated': importer.updated_count,
+            'unchanged': importer.unchanged_count,
+            'skipped': importer.duplicate_count,
+            'near_duplicates': importer.near_duplicate_count,
+            'errored': importer.error_count,
+            'changes': list(importer.changes),
+            'chunk_size': importer.chunk_size,
+            'chunks': list(importer.chunks),
+            'sheets_processed': importer.sheets_processed(),
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+def job_state(record):
+    """任务记录转为接口返回的进度字典"""
+    state = json.loads(record.progress)
+    state['status'] = record.status
+    state['cancel_requested'] = record.cancel_requested
+    return state
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class ImportJobRunner:
+    """进程内的导入线程池"""
+
+    def __init__(self, workers=1, max_jobs=50):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self._app = None
+        self._executor = None
+        self._jobs = {}  # 本进程正在执行的任务
+        self._lock = threading.Lock()
+
+    @property
+    def owner(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def init_app(self, app):
+        """创建导入线程池，接管已退出进程留下的任务"""
+        self._app = app
+        self.workers = app.config.get('IMPORT_WORKERS', self.workers)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='import-worker')
+        with app.app_context():
+            self.recover()
+
+    def submit(self, path, filename, chunk_size, mode='skip', dry_run=False, skip_near_duplicates=False):
+        """提交导入任务，任务结束后删除上传的临时文件"""
+        job = ImportJob(path, filename, chunk_size, mode, dry_run, skip_near_duplicates)
+        db.session.add(QuestionImportJob(
+            id=job.id,
+            status=job.status,
+            path=path,
+            owner=self.owner,
+            progress=json.dumps(job.to_dict(), ensure_ascii=False),
+            created_at=job.created_at
+        ))
+        self._evict()
+        db.session.commit()
+        self._start(job)
+        return job
+
+    def get(self, job_id):
+        """获取任务进度，任务不存在时返回 None"""
+        record = db.session.get(QuestionImportJob, job_id)
+        return job_state(record) if record is not None else None
+
+    def list(self):
+        records = QuestionImportJob.query.order_by(QuestionImportJob.created_at.desc()).limit(self.max_jobs).all()
+        return [job_state(record) for record in records]
+
+    def cancel(self, job_id):
+        """请求取消任务；排队中的任务不会再执行。执行任务的进程在下次写入进度时收到取消请求"""
+        QuestionImportJob.query.filter(
+            QuestionImportJob.id == job_id,
+            QuestionImportJob.status.notin_(FINISHED_STATUSES)
+        ).update({QuestionImportJob.cancel_requested: True}, synchronize_session=False)
+        db.session.commit()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+        return self.get(job_id)
+
+    def recover(self):
+        """接管同一主机上已退出进程留下的未结束任务，返回接管的任务ID"""
+        host = socket.gethostname()
+        recovered = []
+        records = QuestionImportJob.query.filter(QuestionImportJob.status.notin_(FINISHED_STATUSES)).all()
+        for record in records:
+            owner_host, _, owner_pid = (record.owner or '').rpartition(':')
+            if owner_host != host or not owner_pid.isdigit():
+                continue
+            # 启动时本进程还没有执行任何任务，进程号相同（如容器内重启）的任务同样是遗留的
+            if int(owner_pid) != os.getpid() and process_alive(int(owner_pid)):
+                continue
+            claimed = QuestionImportJob.query.filter_by(id=record.id, owner=record.owner).update(
+                {QuestionImportJob.owner: self.owner}, synchronize_session=False
+            )
+            db.session.commit()
+            if not claimed:
+                continue
+            recovered.append(record.id)
+
+            if record.status == 'queued' and record.path and os.path.exists(record.path):
+                self._start(ImportJob.from_record(record))
+                continue
+
+            state = json.loads(record.progress)
+            state['error'] = '执行任务的进程已退出，导入中断（已提交的分块保留）'
+            state['finished_at'] = datetime.utcnow().isoformat()
+            record.status = state['status'] = 'failed'
+            record.progress = json.dumps(state, ensure_ascii=False)
+            record.updated_at = datetime.utcnow()
+            db.session.commit()
+            if record.path and os.path.exists(record.path):
+                os.remove(record.path)
+            if (state['inserted'] or state['updated']) and not state['dry_run']:
+                bank_events.bank_reloaded()
+        return recovered
+
+    def _start(self, job):
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+
+    def _evict(self):
+        """超出保留数量时删除最早结束的任务记录"""
+        keep = db.session.query(QuestionImportJob.id).order_by(
+            QuestionImportJob.created_at.desc()
+        ).limit(self.max_jobs)
+        QuestionImportJob.query.filter(
+            QuestionImportJob.status.in_(FINISHED_STATUSES),
+            QuestionImportJob.id.notin_(keep.scalar_subquery())
+        ).delete(synchronize_session=False)
+
+    def _save(self, job, force=False):
+        """写入任务进度并读取取消请求（未强制时按 PROGRESS_INTERVAL 限频）"""
+        now = time.monotonic()
+        if not force and now - job.saved_at < PROGRESS_INTERVAL:
+            return
+        job.saved_at = now
+        QuestionImportJob.query.filter_by(id=job.id).update({
+            QuestionImportJob.status: job.status,
+            QuestionImportJob.progress: json.dumps(job.to_dict(), ensure_ascii=False),
+            QuestionImportJob.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        cancel_requested = db.session.query(QuestionImportJob.cancel_requested).filter_by(id=job.id).scalar()
+        db.session.commit()
+        if cancel_requested:
+            job.cancel()
+
+    def _run(self, job):
+        with self._app.app_context():
+            try:
+                self._save(job, force=True)
+                if job.cancel_requested:
+                    raise ImportCancelled()
+                job.status = 'running'
+                job.started_at = datetime.utcnow()
+                self._save(job, force=True)
+                self._import(job)
+                job.status = 'completed'
+            except ImportCancelled:
+                job.status = 'cancelled'
+            except Exception as e:
+                db.session.rollback()
+                job.error = str(e)
+                job.status = 'failed'
+                self._app.logger.exception('导入任务 %s 失败', job.id)
+            finally:
+                job.finished_at = datetime.utcnow()
+                try:
+                    self._save(job, force=True)
+                except Exception:
+                    db.session.rollback()
+                    self._app.logger.exception('导入任务 %s 的状态写入失败', job.id)
+                with self._lock:
+                    self._jobs.pop(job.id, None)
+                if os.path.exists(job.path):
+                    os.remove(job.path)
+                # 已提交的分块即使任务取消或出错也已生效；每块提交时已清除相关缓存，结束时再整体重建索引
+                if job.importer.imported_count or job.importer.updated_count:
+                    if not job.importer.dry_run:
+                        bank_events.bank_reloaded()
+                db.session.remove()
+
+    def _import(self, job):
+        importer = job.importer
+        processes = self._app.config.get('IMPORT_PROCESSES', 1)
+        batches = iter_parsed_batches(job.path, processes=processes)
+        try:
+            for sheet_name, batch, error_count in batches:
+                self._save(job)
+                if job.cancel_requested:
+                    raise ImportCancelled()
+                importer.error_count += error_count
+                for fields in batch:
+                    importer.add(sheet_name, fields)
+        finally:
+            # 取消或出错时停止解析进程
+            batches.close()
+
+        # 写入最后一个不满的分块
+        importer.flush()
+
+import_jobs = ImportJobRunner()
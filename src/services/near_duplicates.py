@@ -0,0 +1,229 @@
+"""近似重复题目检测
+
+题干经 NFKC 规范化、转小写并去掉空白和标点后切成连续3个字符的片段，
+用 32 个乘法移位哈希函数对片段集合计算 MinHash 签名（32 个 uint32，存入题目的 minhash 字段）。
+两道题签名中相等位置所占的比例近似于片段集合的 Jaccard 相似度，
+只差几个标点、空格或个别字的题目相似度接近1。
+
+签名按每4个值分成8段做 LSH 分桶：任意一段完全相同的题目才作为候选，
+再按签名相似度确认，查找时只比较同桶的候选而不是整个题库。
+相似度 0.8 的两道题至少有一段相同的概率约为 98.5%，相似度 0.3 时约为 6%。
+"""
+import re
+import threading
+import unicodedata
+import numpy as np
+from src.models.user import db
+from src.models.question import Question
+
+NUM_PERMUTATIONS = 32
+BANDS = 8
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+# 片段数不超过该值时一次计算全部哈希函数
+OUTER_SHINGLE_LIMIT = 2048
+# 签名相似度不低于该值视为近似重复
+SIMILARITY_THRESHOLD = 0.8
+
+NOISE_PATTERN = re.compile(r'[\W_]+')
+
+# 固定种子生成的哈希参数（乘法移位哈希，乘数为奇数），签名写入数据库后不能再改变
+_generator = np.random.RandomState(20240101)
+HASH_MULTIPLIERS = _generator.randint(0, 1 << 63, size=NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+HASH_OFFSETS = _generator.randint(0, 1 << 63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+def normalize_text(question_text):
+    """规范化题干：全角半角统一、转小写、去掉空白和标点"""
+    if question_text is None:
+        return ''
+    return NOISE_PATTERN.sub('', unicodedata.normalize('NFKC', str(question_text)).lower())
+
+def minhash_signatures(question_texts):
+    """批量计算题干的 MinHash 签名（bytes），规范化后为空的题干为 None
+
+    所有题干的字符编码拼成一个数组，3个相邻码点（各不超过21位）拼成一个63位的片段值，
+    去掉跨越题干边界的片段后，每个哈希函数对全部片段算一遍，再按题干分段取最小值。
+    """
+    texts = [normalize_text(question_text) for question_text in question_texts]
+    # 不足3个字符的题干补齐为一个片段（补的 \x00 不会出现在规范化后的题干中）
+    padded = [text.ljust(SHINGLE_SIZE, '\x00') for text in texts if text]
+    if not padded:
+        return [None] * len(texts)
+    
+    lengths = np.fromiter((len(text) for text in padded), dtype=np.int64, count=len(padded))
+    codes = np.frombuffer(''.join(padded).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    shingles = (codes[:-2] << np.uint64(42)) | (codes[1:-1] << np.uint64(21)) | codes[2:]
+    owners = np.repeat(np.arange(len(padded)), lengths)
+    shingles = shingles[owners[:-2] == owners[2:]]
+    starts = np.concatenate(([0], np.cumsum(lengths - (SHINGLE_SIZE - 1))[:-1]))
+    
+    if len(shingles) <= OUTER_SHINGLE_LIMIT:
+        # 片段较少（如单道题）时一次算出全部哈希，避免逐列循环的调用开销
+        hashes = (shingles[:, np.newaxis] * HASH_MULTIPLIERS + HASH_OFFSETS) >> np.uint64(32)
+        minimums = np.minimum.reduceat(hashes, starts, axis=0)
+    else:
+        # 片段很多时逐个哈希函数计算，中间数组保持在一列大小
+        minimums = np.empty((len(padded), NUM_PERMUTATIONS), dtype=np.uint64)
+        for i in range(NUM_PERMUTATIONS):
+            hashes = (shingles * HASH_MULTIPLIERS[i] + HASH_OFFSETS[i]) >> np.uint64(32)
+            minimums[:, i] = np.minimum.reduceat(hashes, starts)
+    signatures = iter(minimums.astype('<u4'))
+    return [next(signatures).tobytes() if text else None for text in texts]
+
+def minhash_signature(question_text):
+    """计算题干的 MinHash 签名（bytes），规范化后为空时返回 None"""
+    return minhash_signatures([question_text])[0]
+
+def similarity(signature_a, signature_b):
+    """两个签名的相似度（相等位置所占比例）"""
+    return float(np.count_nonzero(
+        np.frombuffer(signature_a, dtype='<u4') == np.frombuffer(signature_b, dtype='<u4')
+    )) / NUM_PERMUTATIONS
+
+def band_keys(signature):
+    size = ROWS_PER_BAND * 4
+    return [hash(signature[band * size:(band + 1) * size]) for band in range(BANDS)]
+
+class NearDuplicateIndex:
+    """进程内的 MinHash LSH 索引：{question_id: 签名}，每段一个 {桶: ID 或 ID列表}"""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._signatures = {}
+        self._buckets = [{} for _ in range(BANDS)]
+        self._built = False
+
+    def rebuild(self):
+        """从数据库重建索引（只读取 id 与签名两列）"""
+        rows = db.session.query(Question.id, Question.minhash).filter(Question.minhash.isnot(None)).all()
+        with self._lock:
+            self._signatures = {}
+            self._buckets = [{} for _ in range(BANDS)]
+            for question_id, signature in rows:
+                self._insert(question_id, signature)
+            self._built = True
+
+    def ensure_built(self):
+        """索引尚未构建时先构建"""
+        if not self._built:
+            self.rebuild()
+
+    def add(self, question_id, signature):
+        """新增题目或题干修改后更新索引"""
+        with self._lock:
+            self._discard(question_id)
+            if signature is not None:
+                self._insert(question_id, signature)
+
+    def remove(self, question_id):
+        """删除题目后更新索引"""
+        with self._lock:
+            self._discard(question_id)
+
+    def clear(self):
+        """清空题库后清空索引"""
+        with self._lock:
+            self._signatures = {}
+            self._buckets = [{} for _ in range(BANDS)]
+            self._built = True
+
+    def invalidate(self):
+        """其他进程修改题库后调用，下次使用时从数据库重建"""
+        with self._lock:
+            self._built = False
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def find(self, signature, exclude=None):
+        """查找与签名近似重复的题目，返回按相似度降序的 [(question_id, 相似度)]"""
+        if signature is None:
+            return []
+        with self._lock:
+            candidates = self._candidates(signature)
+            candidates.discard(exclude)
+            matches = []
+            for question_id in candidates:
+                score = similarity(signature, self._signatures[question_id])
+                if score >= self.threshold:
+                    matches.append((question_id, score))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+    def groups(self):
+        """把近似重复的题目合并成组（并查集），返回按最小ID排序的 ID 列表"""
+        parent = {}
+
+        def root(question_id):
+            while parent.get(question_id, question_id) != question_id:
+                question_id = parent[question_id]
+            return question_id
+
+        linked = set()
+        with self._lock:
+            checked = set()
+            for buckets in self._buckets:
+                for bucket in buckets.values():
+                    if not isinstance(bucket, list):
+                        continue
+                    for i, question_id in enumerate(bucket):
+                        for other_id in bucket[i + 1:]:
+                            pair = (min(question_id, other_id), max(question_id, other_id))
+                            if pair in checked:
+                                continue
+                            checked.add(pair)
+                            if similarity(self._signatures[question_id], self._signatures[other_id]) < self.threshold:
+                                continue
+                            linked.update(pair)
+                            a, b = root(pair[0]), root(pair[1])
+                            if a != b:
+                                parent[max(a, b)] = min(a, b)
+
+        members = {}
+        for question_id in linked:
+            members.setdefault(root(question_id), []).append(question_id)
+        return [sorted(group) for _, group in sorted(members.items())]
+
+    def signature(self, question_id):
+        with self._lock:
+            return self._signatures.get(question_id)
+
+    def _candidates(self, signature):
+        candidates = set()
+        for buckets, key in zip(self._buckets, band_keys(signature)):
+            bucket = buckets.get(key)
+            if bucket is None:
+                continue
+            if isinstance(bucket, list):
+                candidates.update(bucket)
+            else:
+                candidates.add(bucket)
+        return candidates
+
+    def _insert(self, question_id, signature):
+        # 绝大多数桶只有一道题，直接存 ID，避免为每个桶创建列表
+        self._signatures[question_id] = signature
+        for buckets, key in zip(self._buckets, band_keys(signature)):
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = question_id
+            elif isinstance(bucket, list):
+                bucket.append(question_id)
+            else:
+                buckets[key] = [bucket, question_id]
+
+    def _discard(self, question_id):
+        signature = self._signatures.pop(question_id, None)
+        if signature is None:
+            return
+        for buckets, key in zip(self._buckets, band_keys(signature)):
+            bucket = buckets.get(key)
+            if isinstance(bucket, list):
+                bucket.remove(question_id)
+                if len(bucket) == 1:
+                    buckets[key] = bucket[0]
+            elif bucket == question_id:
+                del buckets[key]
+
+near_duplicates = NearDuplicateIndex()
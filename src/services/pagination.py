@@ -0,0 +1,76 @@
+"""游标（keyset）分页
+
+列表按若干排序列降序或升序排列，游标记录上一页最后一行的排序列取值，
+下一页直接用 (col1, col2) < (v1, v2) 做范围扫描，不需要 OFFSET。
+游标对客户端不透明：排序列取值经 JSON 编码后再做 base64url 编码。
+
+列表接口统一约定：传入 after 参数（第一页传空值）时使用游标分页，返回 next_cursor。
+with_total 控制是否执行 COUNT(*)：页码分页默认统计，游标分页默认不统计，不统计时 total 返回 null。
+per_page 限制在 1 到 MAX_PER_PAGE 之间。
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, tuple_
+
+# 每页最多返回的行数
+MAX_PER_PAGE = 100
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(values):
+    """把排序列取值编码为游标"""
+    plain = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(plain, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, columns):
+    """把游标解码为排序列取值"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        plain = json.loads(raw)
+        if not isinstance(plain, list) or len(plain) != len(columns):
+            raise InvalidCursor('无效的分页游标')
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value is not None else value
+            for column, value in zip(columns, plain)
+        ]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('无效的分页游标') from e
+
+def keyset_page(query, columns, after=None, per_page=20, descending=True, row_values=None):
+    """按游标取一页
+
+    columns 为排序列（最后一列须唯一，通常为主键）；after 为上一页返回的游标，空表示第一页。
+    row_values 从结果行中取出排序列取值，默认按列名读取属性。
+    返回 (本页结果, 下一页游标)；没有下一页时游标为 None。
+    """
+    if after:
+        values = decode_cursor(after, columns)
+        if descending:
+            query = query.filter(tuple_(*columns) < tuple_(*values))
+        else:
+            query = query.filter(tuple_(*columns) > tuple_(*values))
+    
+    order_by = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*order_by).limit(per_page + 1).all()
+    
+    if len(rows) <= per_page:
+        return rows, None
+    
+    rows = rows[:per_page]
+    if row_values is None:
+        row_values = lambda row: [getattr(row, column.key) for column in columns]
+    return rows, encode_cursor(row_values(rows[-1]))
+
+def with_total_requested(args, default=True):
+    """请求参数 with_total 是否要求返回总数，未传时取 default"""
+    value = args.get('with_total')
+    if value is None:
+        return default
+    return value.lower() != 'false'
+
+def per_page_requested(args, default=20):
+    """请求参数 per_page，未传时取 default，限制在 1 到 MAX_PER_PAGE 之间"""
+    return min(max(args.get('per_page', default, type=int), 1), MAX_PER_PAGE)
@@ -0,0 +1,112 @@
+"""题库流式导出
+
+题目按主键分批读取（每批一次 id > 上一批最大 id 的范围查询，查询之间不持有读事务，
+导出大题库时不会长时间阻塞导入、判分等写操作），逐批写出：
+
+    csv    带 BOM 的 UTF-8 CSV，Excel 可直接打开
+    jsonl  每行一道题目的 JSON
+    xlsx   与导入格式相同的工作簿（题目、选项A-D、答案），可直接重新导入
+
+CSV 和 JSONL 边读边输出；XLSX 以 openpyxl write_only 模式写入临时文件，
+写完后分块输出并删除。内存占用只与批大小有关，与题库大小无关。
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+from sqlalchemy import select
+from src.models.question import Question
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# CSV / JSONL 导出的字段
+EXPORT_FIELDS = [
+    'id', 'question_text', 'question_type', 'option_a', 'option_b', 'option_c', 'option_d',
+    'correct_answer', 'explanation', 'difficulty', 'created_at', 'revision'
+]
+
+# XLSX 导出的表头与导入格式一致
+XLSX_HEADER = ['题目', '选项A', '选项B', '选项C', '选项D', '答案']
+XLSX_FIELDS = ['question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer']
+
+EXPORT_BATCH_SIZE = 1000
+FILE_CHUNK_SIZE = 64 * 1024
+
+def iter_question_rows(engine, batch_size=EXPORT_BATCH_SIZE):
+    """按主键顺序分批读取题目，逐行产出字段字典"""
+    table = Question.__table__
+    columns = [table.c[field] for field in EXPORT_FIELDS]
+    last_id = 0
+    while True:
+        with engine.connect() as connection:
+            rows = connection.execute(
+                select(*columns).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+            ).mappings().all()
+        if not rows:
+            return
+        for row in rows:
+            yield row
+        last_id = rows[-1]['id']
+
+def _plain(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+def iter_csv(engine, batch_size=EXPORT_BATCH_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_FIELDS)
+    for count, row in enumerate(iter_question_rows(engine, batch_size), start=1):
+        writer.writerow([_plain(row[field]) for field in EXPORT_FIELDS])
+        if count % batch_size == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def iter_jsonl(engine, batch_size=EXPORT_BATCH_SIZE):
+    lines = []
+    for row in iter_question_rows(engine, batch_size):
+        lines.append(json.dumps({field: _plain(row[field]) for field in EXPORT_FIELDS}, ensure_ascii=False))
+        if len(lines) >= batch_size:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+def iter_xlsx(engine, batch_size=EXPORT_BATCH_SIZE):
+    from openpyxl import Workbook
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='export_')
+    os.close(fd)
+    try:
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('题库')
+        worksheet.append(XLSX_HEADER)
+        for row in iter_question_rows(engine, batch_size):
+            worksheet.append([row[field] for field in XLSX_FIELDS])
+        workbook.save(path)
+
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+EXPORT_WRITERS = {
+    'csv': iter_csv,
+    'jsonl': iter_jsonl,
+    'xlsx': iter_xlsx,
+}
+
+def iter_export(engine, export_format, batch_size=EXPORT_BATCH_SIZE):
+    """按格式逐块产出导出文件内容（bytes）"""
+    return EXPORT_WRITERS[export_format](engine, batch_size)
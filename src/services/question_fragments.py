@@ -0,0 +1,74 @@
+"""考试题目JSON片段缓存
+
+每道题按 (题目ID, 修订号) 缓存一段预先编码好的JSON字节串（只含题干、题型和选项），
+生成试卷时直接拼接片段，不再逐题构造字典并重新序列化。
+"""
+import json
+import threading
+from src.models.user import db
+from src.models.question import Question
+
+def encode_question(question):
+    """把题目编码为考试下发用的JSON片段"""
+    return json.dumps(question.to_exam_dict(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+class FragmentCache:
+    """{question_id: (revision, fragment)}"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fragments = {}
+
+    def get(self, question_id, revision):
+        with self._lock:
+            entry = self._fragments.get(question_id)
+        if entry is None or entry[0] != revision:
+            return None
+        return entry[1]
+
+    def put(self, question_id, revision, fragment):
+        with self._lock:
+            self._fragments[question_id] = (revision, fragment)
+
+    def invalidate(self, question_ids):
+        with self._lock:
+            for question_id in question_ids:
+                self._fragments.pop(question_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._fragments = {}
+
+fragment_cache = FragmentCache()
+
+def build_questions_json(question_ids):
+    """拼接试卷题目JSON数组
+
+    只查询题目的ID和修订号，缓存未命中的题目再用一次 IN 查询加载并编码。
+    返回 (题库中仍存在的题目ID列表, JSON数组字节串)。
+    """
+    if not question_ids:
+        return [], b'[]'
+    
+    revisions = dict(db.session.query(
+        Question.id,
+        Question.revision
+    ).filter(Question.id.in_(question_ids)).all())
+    
+    fragments = {}
+    missing = []
+    for question_id, revision in revisions.items():
+        fragment = fragment_cache.get(question_id, revision)
+        if fragment is None:
+            missing.append(question_id)
+        else:
+            fragments[question_id] = fragment
+    
+    if missing:
+        for question in Question.query.filter(Question.id.in_(missing)).all():
+            fragment = encode_question(question)
+            fragment_cache.put(question.id, question.revision, fragment)
+            fragments[question.id] = fragment
+    
+    found_ids = [question_id for question_id in question_ids if question_id in fragments]
+    return found_ids, b'[' + b','.join(fragments[question_id] for question_id in found_ids) + b']'
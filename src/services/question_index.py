@@ -0,0 +1,103 @@
+import bisect
+import random
+import threading
+from src.models.user import db
+from src.models.question import Question
+
+# 考试结构：多选60题、判断20题、单选60题
+EXAM_BLUEPRINT = (('multiple', 60), ('judge', 20), ('single', 60))
+
+class QuestionIndex:
+    """进程内按题型维护的题目ID索引
+
+    每个题型保存一个有序的ID列表，抽题时直接在列表上采样，
+    不再为整张题目表构建ORM对象。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}      # question_type -> 有序ID列表
+        self._types = {}    # question_id -> question_type
+        self._built = False
+
+    def rebuild(self):
+        """从数据库重建索引（只读取 id 与题型两列）"""
+        rows = db.session.query(Question.id, Question.question_type).order_by(Question.id).all()
+        ids = {}
+        types = {}
+        for question_id, question_type in rows:
+            ids.setdefault(question_type, []).append(question_id)
+            types[question_id] = question_type
+        with self._lock:
+            self._ids = ids
+            self._types = types
+            self._built = True
+
+    def ensure_built(self):
+        """索引尚未构建时先构建"""
+        if not self._built:
+            self.rebuild()
+
+    def add(self, question_id, question_type):
+        """新增题目或题型变更后更新索引"""
+        with self._lock:
+            self._discard(question_id)
+            bisect.insort(self._ids.setdefault(question_type, []), question_id)
+            self._types[question_id] = question_type
+
+    def remove(self, question_id):
+        """删除题目后更新索引"""
+        with self._lock:
+            self._discard(question_id)
+
+    def clear(self):
+        """清空题库后清空索引"""
+        with self._lock:
+            self._ids = {}
+            self._types = {}
+            self._built = True
+
+    def invalidate(self):
+        """其他进程修改题库后调用，下次使用时从数据库重建"""
+        with self._lock:
+            self._built = False
+
+    def count(self, question_type):
+        with self._lock:
+            return len(self._ids.get(question_type, ()))
+
+    def sample(self, question_type, k, rng=random):
+        """从指定题型中随机抽取k个ID，不足k个时全部返回"""
+        with self._lock:
+            ids = self._ids.get(question_type, [])
+            if len(ids) <= k:
+                return list(ids)
+            return rng.sample(ids, k)
+
+    def _discard(self, question_id):
+        question_type = self._types.pop(question_id, None)
+        if question_type is None:
+            return
+        ids = self._ids.get(question_type, [])
+        pos = bisect.bisect_left(ids, question_id)
+        if pos < len(ids) and ids[pos] == question_id:
+            del ids[pos]
+
+question_index = QuestionIndex()
+
+def draw_question_ids(rng=random, blueprint=EXAM_BLUEPRINT):
+    """按考试结构抽取题目ID并打乱顺序"""
+    question_index.ensure_built()
+    selected_ids = []
+    for question_type, count in blueprint:
+        selected_ids.extend(question_index.sample(question_type, count, rng))
+    rng.shuffle(selected_ids)
+    return selected_ids
+
+def load_questions(question_ids):
+    """用一次 IN 查询加载题目，并保持传入的顺序"""
+    if not question_ids:
+        return []
+    questions = Question.query.filter(Question.id.in_(question_ids)).all()
+    by_id = {q.id: q for q in questions}
+    return [by_id[question_id] for question_id in question_ids if question_id in by_id]
@@ -0,0 +1,167 @@
+"""题目全文检索
+
+question_fts 是以 question 表为外部内容的 FTS5 虚拟表，索引题干和选项A-D，
+使用 trigram 分词器（按连续3个字符切分），中文无需分词即可做任意子串匹配。
+question 表上的触发器在插入、修改、删除时同步索引，ORM、批量导入和清空题库都会经过触发器。
+
+trigram 无法匹配不足3个字符的检索词，这类检索走 question_fts_short：
+不保存内容的 FTS5 表，同样索引题干和选项A-D，每个字符转成一个词元（Unicode 码位的十六进制），
+单字检索按词元匹配，两字检索按相邻两个词元的短语匹配，与子串匹配结果一致（ASCII 字母不区分大小写，同 LIKE）。
+字符转词元由 search_tokens 完成，本模块在每个 SQLite 连接上注册该函数供触发器调用，
+因此修改 question 表必须经过本应用的连接（sqlite3 命令行等外部工具修改题目会报 no such function）。
+
+全文索引按相关度（bm25）排序，短检索词按题目编号排序。
+SQLite 不支持 FTS5 或 trigram 分词器时全部使用 LIKE 子串查询。
+"""
+import sqlite3
+import threading
+from sqlalchemy import column, event, or_, table, text
+from sqlalchemy.engine import Engine
+from src.models.user import db
+from src.models.question import Question
+
+# trigram 分词器能匹配的最短检索词
+MIN_MATCH_LENGTH = 3
+
+SEARCH_COLUMNS = ['question_text', 'option_a', 'option_b', 'option_c', 'option_d']
+
+question_fts = table('question_fts', column('rowid'), column('rank'))
+question_fts_short = table('question_fts_short', column('rowid'))
+
+def search_tokens(value):
+    """把文本转成以空格分隔的单字词元（码位的十六进制，ASCII 字母先转小写）"""
+    if value is None:
+        return None
+    return ' '.join(format(ord(char.lower() if char.isascii() else char), 'x') for char in value)
+
+@event.listens_for(Engine, 'connect')
+def _register_functions(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('search_tokens', 1, search_tokens, deterministic=True)
+
+def _create_statements():
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{name}' for name in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{name}' for name in SEARCH_COLUMNS)
+    return [
+        f"CREATE VIRTUAL TABLE question_fts USING fts5({columns}, "
+        f"content='question', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER question_fts_insert AFTER INSERT ON question BEGIN "
+        f"INSERT INTO question_fts(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER question_fts_delete AFTER DELETE ON question BEGIN "
+        f"INSERT INTO question_fts(question_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER question_fts_update AFTER UPDATE OF {columns} ON question BEGIN "
+        f"INSERT INTO question_fts(question_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO question_fts(rowid, {columns}) VALUES (new.id, {new_values}); END",
+    ]
+
+def _short_values(prefix):
+    return ', '.join(f'search_tokens({prefix}{name})' for name in SEARCH_COLUMNS)
+
+def _create_short_statements():
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = _short_values('new.')
+    old_values = _short_values('old.')
+    return [
+        f"CREATE VIRTUAL TABLE question_fts_short USING fts5({columns}, content='', "
+        f"tokenize='unicode61 remove_diacritics 0')",
+        f"CREATE TRIGGER question_fts_short_insert AFTER INSERT ON question BEGIN "
+        f"INSERT INTO question_fts_short(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER question_fts_short_delete AFTER DELETE ON question BEGIN "
+        f"INSERT INTO question_fts_short(question_fts_short, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER question_fts_short_update AFTER UPDATE OF {columns} ON question BEGIN "
+        f"INSERT INTO question_fts_short(question_fts_short, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO question_fts_short(rowid, {columns}) VALUES (new.id, {new_values}); END",
+    ]
+
+def _fill_short_statement():
+    """按题目表写入短检索词索引（不保存内容的表不支持 rebuild）"""
+    columns = ', '.join(SEARCH_COLUMNS)
+    return f"INSERT INTO question_fts_short(rowid, {columns}) SELECT id, {_short_values('')} FROM question"
+
+def match_expression(search):
+    """把检索词转成 FTS5 短语查询（整体作为一个短语，双引号转义）"""
+    return '"' + search.replace('"', '""') + '"'
+
+def short_match_expression(search):
+    """把不足3个字符的检索词转成相邻单字词元的短语查询"""
+    return '"' + search_tokens(search) + '"'
+
+class QuestionSearch:
+    """题目检索：全文索引可用时用 FTS5，否则用 LIKE"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.available = False
+        self.short_available = False
+
+    def _table_exists(self, name):
+        return db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': name}
+        ).first() is not None
+
+    def _create(self, name, statements, fill):
+        """创建索引表和同步触发器（已存在时跳过），新建时按题目表写入索引，返回是否可用"""
+        if self._table_exists(name):
+            return True
+        try:
+            for statement in statements:
+                db.session.execute(text(statement))
+            db.session.execute(text(fill))
+            db.session.commit()
+        except Exception:
+            # SQLite 版本过旧，不支持 FTS5 或 trigram 分词器
+            db.session.rollback()
+            return False
+        return True
+
+    def ensure_index(self):
+        """创建全文索引和短检索词索引（已存在时跳过）"""
+        with self._lock:
+            self.available = self._create(
+                'question_fts', _create_statements(),
+                "INSERT INTO question_fts(question_fts) VALUES ('rebuild')"
+            )
+            self.short_available = self.available and self._create(
+                'question_fts_short', _create_short_statements(), _fill_short_statement()
+            )
+            return self.available
+
+    def rebuild(self):
+        """按题目表重建全文索引和短检索词索引"""
+        if self.available:
+            db.session.execute(text("INSERT INTO question_fts(question_fts) VALUES ('rebuild')"))
+        if self.short_available:
+            db.session.execute(text("INSERT INTO question_fts_short(question_fts_short) VALUES ('delete-all')"))
+            db.session.execute(text(_fill_short_statement()))
+        db.session.commit()
+
+    def apply(self, query, search, ranked=True):
+        """在题目查询上加检索条件；走全文索引且 ranked 时按相关度排序，否则按题目编号排序
+
+        游标分页需要可比较的排序列，调用方传 ranked=False 后自行按题目编号排序
+        （FTS5 的 rank 不能用在 WHERE 条件中）。
+        """
+        if self.available and len(search) >= MIN_MATCH_LENGTH:
+            query = query.join(question_fts, question_fts.c.rowid == Question.id).filter(
+                text('question_fts MATCH :search_match').bindparams(search_match=match_expression(search))
+            )
+            if ranked:
+                query = query.order_by(question_fts.c.rank, Question.id)
+            return query
+        if self.short_available:
+            query = query.filter(Question.id.in_(
+                db.select(question_fts_short.c.rowid).where(
+                    text('question_fts_short MATCH :search_match').bindparams(
+                        search_match=short_match_expression(search))
+                )
+            ))
+        else:
+            query = query.filter(or_(*[getattr(Question, name).contains(search) for name in SEARCH_COLUMNS]))
+        if ranked:
+            query = query.order_by(Question.id)
+        return query
+
+question_search = QuestionSearch()
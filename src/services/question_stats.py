@@ -0,0 +1,68 @@
+"""题库统计缓存
+
+一次 GROUP BY question_type, difficulty 查询得到各题型、各难度的题目数量，
+汇总出总数、题型数量和难度分布，结果缓存在进程内，题库变更时由 bank_events 清除。
+
+缓存失效后同时到达的多个统计请求只有一个查询数据库，其余请求等待它的结果。
+查询期间题库又发生变更时，本次结果照常返回但不写入缓存。
+"""
+import threading
+from sqlalchemy import func
+from src.models.user import db
+from src.models.question import Question
+
+QUESTION_TYPES = ('single', 'multiple', 'judge')
+
+def summarize(rows):
+    """把 (题型, 难度, 数量) 行汇总为统计结果"""
+    stats = {'total': 0, **{question_type: 0 for question_type in QUESTION_TYPES}}
+    by_difficulty = {}
+    by_type = {question_type: {} for question_type in QUESTION_TYPES}
+    for question_type, difficulty, count in rows:
+        # 难度为空的题目按默认难度1统计
+        difficulty = str(difficulty if difficulty is not None else 1)
+        stats['total'] += count
+        stats[question_type] = stats.get(question_type, 0) + count
+        by_difficulty[difficulty] = by_difficulty.get(difficulty, 0) + count
+        type_counts = by_type.setdefault(question_type, {})
+        type_counts[difficulty] = type_counts.get(difficulty, 0) + count
+    stats['by_difficulty'] = by_difficulty
+    stats['by_type_difficulty'] = by_type
+    return stats
+
+class QuestionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._stats = None
+        self._generation = 0
+
+    def get(self):
+        """返回题库统计，缓存失效时查询一次数据库"""
+        stats = self._stats
+        if stats is not None:
+            return stats
+        with self._load_lock:
+            # 等待期间其他请求可能已经加载完成
+            with self._lock:
+                if self._stats is not None:
+                    return self._stats
+                generation = self._generation
+            rows = db.session.query(
+                Question.question_type,
+                Question.difficulty,
+                func.count(Question.id)
+            ).group_by(Question.question_type, Question.difficulty).all()
+            stats = summarize(rows)
+            with self._lock:
+                if self._generation == generation:
+                    self._stats = stats
+            return stats
+
+    def invalidate(self):
+        """题库变更后清除缓存"""
+        with self._lock:
+            self._stats = None
+            self._generation += 1
+
+question_stats = QuestionStats()
@@ -0,0 +1,90 @@
+"""按题库版本缓存的接口响应
+
+只由题库内容决定的 GET 接口（题目列表、题库统计等）以题库版本号作为强 ETag：
+请求带 If-None-Match 且与当前版本一致时直接返回 304，不查询数据库。
+服务器端按 (接口, 查询参数, 题库版本) 缓存响应正文，题库变更后版本号递增，旧缓存不再命中，
+并由 bank_events 统一清空。
+"""
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, current_app, request
+from src.services.bank_version import bank_version
+
+RESPONSE_CACHE_SIZE = 256
+# 超过该大小的响应正文（如 per_page 很大的列表）不缓存
+MAX_CACHED_BODY = 1024 * 1024
+
+def bank_etag():
+    """当前题库版本对应的 ETag（不含引号）"""
+    return f'bank-{bank_version.current}'
+
+class ResponseCache:
+    """响应正文缓存（LRU）：{(接口, 查询参数, 题库版本): (content_type, 正文)}"""
+
+    def __init__(self, max_size=RESPONSE_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._responses = OrderedDict()
+        self.max_size = max_size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is not None:
+                self._responses.move_to_end(key)
+            return entry
+
+    def put(self, key, content_type, body):
+        if len(body) > MAX_CACHED_BODY:
+            return
+        with self._lock:
+            self._responses[key] = (content_type, body)
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.max_size:
+                self._responses.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._responses = OrderedDict()
+
+response_cache = ResponseCache()
+
+def _with_etag(response, etag):
+    response.set_etag(etag)
+    # 浏览器每次都带 If-None-Match 重新验证，不直接使用本地副本
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def bank_cached(auth=None):
+    """装饰只依赖题库内容的 GET 接口
+
+    auth 为权限检查函数（如 require_admin），在返回 304 或缓存响应之前执行。
+    只缓存状态码为 200 的响应。
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if auth is not None:
+                auth_check = auth()
+                if auth_check:
+                    return auth_check
+
+            # 先取版本号再生成响应：生成期间题库变更时，缓存的正文只会比版本号新
+            etag = bank_etag()
+            if request.if_none_match.contains(etag):
+                return _with_etag(Response(status=304), etag)
+
+            key = (request.endpoint, tuple(sorted(request.args.items(multi=True))), etag)
+            cached = response_cache.get(key)
+            if cached is not None:
+                content_type, body = cached
+                return _with_etag(Response(body, content_type=content_type), etag)
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            response_cache.put(key, response.content_type, response.get_data())
+            return _with_etag(response, etag)
+        return wrapper
+    return decorator
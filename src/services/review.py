@@ -0,0 +1,103 @@
+"""错题间隔重复复习（SM-2）
+
+每条错题记录保存难易系数 ease、复习间隔 interval_days、连续答对次数 review_count
+和下次复习时间 due_at。复习队列按 (user_id, due_at) 索引做范围扫描，
+复习作答后整批计算新的复习计划并一次性批量更新。
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam
+from src.models.user import db
+from src.models.question import Question
+from src.models.exam import WrongQuestion
+from src.services.answer_keys import answer_keys
+from src.services.grading import LAPSE_EASE_PENALTY, LAPSE_MIN_EASE, check_answers
+
+DEFAULT_EASE = 2.5
+# 答错后间隔多久再次复习
+RELEARN_DELAY = timedelta(minutes=10)
+
+def next_schedule(ease, interval_days, review_count, is_correct):
+    """计算下一次复习计划，返回 (ease, interval_days, review_count, 距下次复习的时长)"""
+    ease = ease or DEFAULT_EASE
+    if not is_correct:
+        return max(LAPSE_MIN_EASE, ease - LAPSE_EASE_PENALTY), 0, 0, RELEARN_DELAY
+    
+    review_count = (review_count or 0) + 1
+    if review_count == 1:
+        interval_days = 1
+    elif review_count == 2:
+        interval_days = 6
+    else:
+        interval_days = round((interval_days or 1) * ease, 1)
+    return ease, interval_days, review_count, timedelta(days=interval_days)
+
+def due_reviews(user_id, limit=20, now=None):
+    """取出到期的复习题目（按到期时间先后），返回 [(WrongQuestion, Question)]"""
+    now = now or datetime.utcnow()
+    return db.session.query(WrongQuestion, Question).join(
+        Question, Question.id == WrongQuestion.question_id
+    ).filter(
+        WrongQuestion.user_id == user_id,
+        WrongQuestion.due_at <= now,
+        WrongQuestion.is_mastered == False
+    ).order_by(WrongQuestion.due_at).limit(limit).all()
+
+def apply_reviews(user_id, answers):
+    """批量判分并更新复习计划（不提交事务）
+
+    answers 为 [(question_id, user_answer)]，只处理该用户错题本中的题目。
+    返回每题的判分结果和新的复习计划。
+    """
+    question_ids = [question_id for question_id, _ in answers]
+    records = {
+        record.question_id: record
+        for record in WrongQuestion.query.filter(
+            WrongQuestion.user_id == user_id,
+            WrongQuestion.question_id.in_(question_ids)
+        ).all()
+    }
+    answers = [(question_id, user_answer) for question_id, user_answer in answers if question_id in records]
+    results = check_answers([question_id for question_id, _ in answers], [user_answer for _, user_answer in answers])
+    keys = answer_keys.get_many({question_id for question_id, _ in answers})
+    
+    now = datetime.utcnow()
+    updates = []
+    reviewed = []
+    for (question_id, _), is_correct in zip(answers, results):
+        if is_correct is None:
+            continue
+        record = records[question_id]
+        ease, interval_days, review_count, delay = next_schedule(
+            record.ease, record.interval_days, record.review_count, is_correct
+        )
+        updates.append({
+            'b_id': record.id,
+            'b_ease': ease,
+            'b_interval_days': interval_days,
+            'b_review_count': review_count,
+            'b_due_at': now + delay,
+            'b_wrong_count': record.wrong_count + (0 if is_correct else 1),
+            'b_last_wrong_time': record.last_wrong_time if is_correct else now
+        })
+        reviewed.append({
+            'question_id': question_id,
+            'is_correct': is_correct,
+            'correct_answer': keys[question_id][1],
+            'interval_days': interval_days,
+            'due_at': (now + delay).isoformat()
+        })
+    
+    if updates:
+        table = WrongQuestion.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('b_id')).values(
+                ease=bindparam('b_ease'),
+                interval_days=bindparam('b_interval_days'),
+                review_count=bindparam('b_review_count'),
+                due_at=bindparam('b_due_at'),
+                wrong_count=bindparam('b_wrong_count'),
+                last_wrong_time=bindparam('b_last_wrong_time')
+            ),
+            updates
+        )
+    return reviewed
@@ -4,6 +4,8 @@ let currentExam = null;
 let examQuestions = [];
 let currentQuestionIndex = 0;
 let userAnswers = {};
+let pendingSaves = {};
+let currentImportJob = null;
 
 // 页面加载完成后初始化
 document.addEventListener('DOMContentLoaded', function() {
@@ -583,27 +585,81 @@ async function logout() {
 // 开始考试
 async function startExam() {
     try {
-        const response = await fetch('/api/questions/random');
+        const response = await fetch('/api/exam/start', { method: 'POST' });
         const data = await response.json();
         
-        if (response.ok) {
-            examQuestions = data.questions;
-            currentQuestionIndex = 0;
-            userAnswers = {};
-            
-            document.getElementById('examStart').style.display = 'none';
-            document.getElementById('examContent').style.display = 'block';
-            document.getElementById('totalQuestions').textContent = examQuestions.length;
-            
-            displayQuestion();
-        } else {
+        // 有未完成的考试时继续该场考试
+        if (!response.ok && !data.exam_id) {
             showToast(data.error || '开始考试失败', 'error');
+            return;
+        }
+        currentExam = data.exam_id;
+        
+        const questionsResponse = await fetch(`/api/exam/${currentExam}/questions`);
+        const questionsData = await questionsResponse.json();
+        if (!questionsResponse.ok) {
+            showToast(questionsData.error || '开始考试失败', 'error');
+            return;
         }
+        
+        examQuestions = questionsData.questions;
+        currentQuestionIndex = 0;
+        userAnswers = await loadSavedAnswers(currentExam);
+        pendingSaves = {};
+        
+        document.getElementById('examStart').style.display = 'none';
+        document.getElementById('examContent').style.display = 'block';
+        document.getElementById('totalQuestions').textContent = examQuestions.length;
+        
+        displayQuestion();
     } catch (error) {
         showToast('网络错误', 'error');
     }
 }
 
+// 加载已暂存的答案（用于恢复考试）
+async function loadSavedAnswers(examId) {
+    const answers = {};
+    const response = await fetch(`/api/exam/${examId}/answers`);
+    if (!response.ok) {
+        return answers;
+    }
+    
+    const data = await response.json();
+    const questionTypes = {};
+    examQuestions.forEach(question => questionTypes[question.id] = question.question_type);
+    data.answers.forEach(item => {
+        if (!item.answer) return;
+        answers[item.question_id] = questionTypes[item.question_id] === 'multiple' ? item.answer.split(',') : item.answer;
+    });
+    return answers;
+}
+
+// 暂存单题答案：同一题的暂存依次发送，后一次总在前一次完成后发出，发送时取最新答案
+function saveAnswer(questionId) {
+    const examId = currentExam;
+    const previous = pendingSaves[questionId] || Promise.resolve();
+    const save = previous.then(async () => {
+        try {
+            const response = await fetch(`/api/exam/${examId}/answer`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ question_id: questionId, answer: userAnswers[questionId] }),
+            });
+            if (!response.ok) {
+                const data = await response.json();
+                showToast(data.error || '暂存答案失败', 'warning');
+            }
+        } catch (error) {
+            console.error('暂存答案失败:', error);
+        }
+    });
+    pendingSaves[questionId] = save;
+    return save;
+}
+
 // 显示题目
 function displayQuestion() {
     if (currentQuestionIndex >= examQuestions.length) return;
@@ -705,6 +761,8 @@ function selectOption(element, value) {
         element.classList.add('selected');
         userAnswers[question.id] = value;
     }
+    
+    saveAnswer(question.id);
 }
 
 // 上一题
@@ -729,23 +787,57 @@ async function submitExam() {
         return;
     }
     
-    // 计算得分（简单的客户端计算）
-    let correctCount = 0;
-    examQuestions.forEach(question => {
-        const userAnswer = userAnswers[question.id];
-        if (userAnswer) {
-            const answerStr = Array.isArray(userAnswer) ? userAnswer.sort().join(',') : userAnswer;
-            const correctStr = question.correct_answer;
-            if (answerStr === correctStr) {
-                correctCount++;
-            }
+    try {
+        // 等待进行中的暂存完成，避免暂存在交卷之后到达而被拒绝；交卷时再带上全部答案，暂存失败的题目也不会丢失
+        await Promise.all(Object.values(pendingSaves));
+        const answers = Object.entries(userAnswers).map(([questionId, answer]) => ({
+            question_id: Number(questionId),
+            answer: answer
+        }));
+        const response = await fetch(`/api/exam/${currentExam}/submit`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ answers: answers }),
+        });
+        
+        const data = await response.json();
+        
+        if (response.status === 202) {
+            // 服务器异步判分，轮询考试结果
+            showToast('考试已提交，正在判分...', 'info');
+            pollExamResult(currentExam);
+        } else if (response.ok) {
+            currentExam = null;
+            showToast(`考试完成！得分：${data.score.toFixed(1)}分`, 'success');
+            showExamResult(data);
+        } else {
+            showToast(data.error || '提交失败', 'error');
         }
-    });
-    
-    const score = (correctCount / examQuestions.length) * 100;
-    
-    showToast(`考试完成！得分：${score.toFixed(1)}分`, 'success');
-    showExamResult({ score, correct_count: correctCount, total_questions: examQuestions.length });
+    } catch (error) {
+        showToast('网络错误', 'error');
+    }
+}
+
+// 轮询异步判分结果
+async function pollExamResult(examId) {
+    try {
+        const response = await fetch(`/api/exam/${examId}/result`);
+        const data = await response.json();
+        
+        if (response.status === 202) {
+            setTimeout(() => pollExamResult(examId), 1000);
+        } else if (response.ok && data.exam.status === 'completed') {
+            currentExam = null;
+            showToast(`考试完成！得分：${data.exam.score.toFixed(1)}分`, 'success');
+            showExamResult(data.exam);
+        } else {
+            showToast(data.error || '判分失败', 'error');
+        }
+    } catch (error) {
+        setTimeout(() => pollExamResult(examId), 3000);
+    }
 }
 
 // 显示考试结果
@@ -806,6 +898,9 @@ async function handleImport(event) {
     
     const formData = new FormData();
     formData.append('file', file);
+    formData.append('mode', document.getElementById('importMode').value);
+    formData.append('dry_run', document.getElementById('importDryRun').checked ? 'true' : 'false');
+    formData.append('skip_near_duplicates', document.getElementById('importSkipNearDuplicates').checked ? 'true' : 'false');
     
     try {
         const response = await fetch('/api/admin/import-excel', {
@@ -815,11 +910,11 @@ async function handleImport(event) {
         
         const data = await response.json();
         
-        if (response.ok) {
-            showToast(data.message, 'success');
-            updateImportLog(data);
-            loadQuestionStats();
+        if (response.status === 202) {
+            currentImportJob = data.job_id;
             fileInput.value = '';
+            showImportProgress(data.job);
+            pollImportJob(data.job_id);
         } else {
             showToast(data.error || '导入失败', 'error');
         }
@@ -828,6 +923,77 @@ async function handleImport(event) {
     }
 }
 
+// 轮询导入任务进度
+async function pollImportJob(jobId) {
+    try {
+        const response = await fetch(`/api/admin/import-jobs/${jobId}`);
+        const data = await response.json();
+        
+        if (!response.ok) {
+            document.getElementById('importProgress').style.display = 'none';
+            showToast(data.error || '导入失败', 'error');
+            return;
+        }
+        
+        const job = data.job;
+        showImportProgress(job);
+        
+        if (job.status === 'queued' || job.status === 'running') {
+            setTimeout(() => pollImportJob(jobId), 1000);
+            return;
+        }
+        
+        currentImportJob = null;
+        document.getElementById('importProgress').style.display = 'none';
+        if (job.status === 'completed' && job.dry_run) {
+            showToast(`预览完成：新增 ${job.inserted}，变更 ${job.updated}，未变化 ${job.unchanged}，跳过 ${job.skipped}`, 'info');
+        } else if (job.status === 'completed' && job.mode === 'upsert') {
+            showToast(`导入完成！新增 ${job.inserted} 道，更新 ${job.updated} 道题目`, 'success');
+        } else if (job.status === 'completed') {
+            showToast(`导入完成！成功导入 ${job.inserted} 道题目`, 'success');
+        } else if (job.status === 'cancelled') {
+            showToast(`导入已取消，已导入 ${job.inserted} 道题目`, 'info');
+        } else {
+            showToast(job.error || '导入失败', 'error');
+        }
+        updateImportLog({imported_count: job.inserted, sheets_processed: job.sheets_processed});
+        loadQuestionStats();
+    } catch (error) {
+        setTimeout(() => pollImportJob(jobId), 3000);
+    }
+}
+
+// 显示导入进度
+function showImportProgress(job) {
+    document.getElementById('importProgress').style.display = 'block';
+    document.getElementById('importProgressText').textContent = job.mode === 'upsert'
+        ? `已解析 ${job.rows_parsed} 行，新增 ${job.inserted}，更新 ${job.updated}，未变化 ${job.unchanged}，错误 ${job.errored}`
+        : `已解析 ${job.rows_parsed} 行，导入 ${job.inserted}，跳过 ${job.skipped}，错误 ${job.errored}`;
+    if (job.skip_near_duplicates) {
+        document.getElementById('importProgressText').textContent += `，近似重复 ${job.near_duplicates}`;
+    }
+}
+
+// 取消导入任务
+async function cancelImport() {
+    if (!currentImportJob) {
+        return;
+    }
+    
+    try {
+        const response = await fetch(`/api/admin/import-jobs/${currentImportJob}/cancel`, {
+            method: 'POST'
+        });
+        const data = await response.json();
+        
+        if (!response.ok) {
+            showToast(data.error || '取消失败', 'error');
+        }
+    } catch (error) {
+        showToast('网络错误', 'error');
+    }
+}
+
 // 更新导入日志
 function updateImportLog(data) {
     const container = document.getElementById('importLog');